@@ -8,6 +8,8 @@ from database import get_engine,init_tables_and_migrate
 from create_admin import create_initial_admin
 from pipeline.run_pipeline import run_full_pipeline
 from pipeline.predict import predict_for_username
+from pipeline.rollups import load_rollup
+from pipeline.schema import read_table
 from visualize import plot_weekly_progress, plot_growth_curve, plot_user_comparison, plot_difficulty_ratio, plot_weekly_breakdown,plot_hard_density,plot_rolling_growth,plot_growth_with_drift 
 from reset_db import reset_database
 
@@ -139,20 +141,82 @@ if st.sidebar.button("Logout"):
 # CACHED DB LOAD
 # -----------------------------
 @st.cache_data(ttl=10)
-def load_data():
+def load_usernames():
+    """Users with engineered features, for the user pickers."""
     engine = get_engine()
     try:
-        df_data = pd.read_sql("SELECT * FROM dsa_data ORDER BY username, week", engine)
-    except:
-        df_data = pd.DataFrame()
+        users = pd.read_sql(
+            "SELECT DISTINCT username FROM dsa_features ORDER BY username", engine
+        )["username"].tolist()
+    except Exception:
+        users = []
 
+    engine.dispose()
+    return users
+
+
+@st.cache_data(ttl=10)
+def load_user_features(username):
+    """One user's daily feature rows (not the whole table)."""
+    engine = get_engine()
+    try:
+        df = read_table(
+            engine, "dsa_features",
+            where="username = :username", params={"username": username},
+            order_by="week, date"
+        )
+    except Exception:
+        df = pd.DataFrame()
+
+    engine.dispose()
+    return df
+
+
+@st.cache_data(ttl=10)
+def load_latest_features():
+    """Each user's most recent feature row, for the leaderboard."""
+    engine = get_engine()
+    try:
+        df = read_table(
+            engine, "dsa_features",
+            where="""date = (
+                SELECT MAX(f.date) FROM dsa_features f
+                WHERE f.username = dsa_features.username
+            )""",
+            order_by="username"
+        )
+    except Exception:
+        df = pd.DataFrame()
+
+    engine.dispose()
+    return df
+
+
+@st.cache_data(ttl=10)
+def load_rollups(username):
+    """One user's compact per-week / per-month rows."""
+    engine = get_engine()
     try:
-        df_feat = pd.read_sql("SELECT * FROM dsa_features ORDER BY username, week", engine)
-    except:
-        df_feat = pd.DataFrame()
+        weekly = load_rollup(engine, "weekly", username=username)
+        monthly = load_rollup(engine, "monthly", username=username)
+    except Exception:
+        weekly, monthly = pd.DataFrame(), pd.DataFrame()
 
     engine.dispose()
-    return df_data, df_feat
+    return weekly, monthly
+
+
+@st.cache_data(ttl=10)
+def load_predictions():
+    """Forecasts precomputed by the pipeline's predict_all stage."""
+    engine = get_engine()
+    try:
+        df = pd.read_sql("SELECT * FROM predictions", engine)
+    except Exception:
+        df = pd.DataFrame()
+
+    engine.dispose()
+    return df
 
 
 # -----------------------------
@@ -180,18 +244,24 @@ menu = st.sidebar.radio(
 if menu == "Dashboard":
     st.header("📌 User Dashboard")
 
-    df_data, df_feat = load_data()
-    if df_feat.empty:
+    users = load_usernames()
+    if not users:
         st.warning("No feature data available.")
     else:
-        username = st.selectbox("Select user", df_feat["username"].unique())
-        user_df = df_feat[df_feat["username"] == username].sort_values("week")
+        username = st.selectbox("Select user", users)
+        user_df = load_user_features(username)
 
         st.subheader("📈 Stats")
         st.dataframe(user_df.tail(5))
 
+        weekly, monthly = load_rollups(username)
+
         st.subheader("📊 Growth Curve")
-        st.pyplot(plot_growth_curve(user_df))
+        st.pyplot(plot_growth_curve(user_df if weekly.empty else weekly))
+
+        if not monthly.empty:
+            st.subheader("🗓️ Monthly Summary")
+            st.dataframe(monthly.tail(6))
 
     # -----------------------------
     # 🚨 Drift Alert
@@ -203,11 +273,11 @@ if menu == "Dashboard":
 
     username = st.selectbox(
         "Select user",
-        df_feat["username"].unique(),
+        users,
         key="performance_alert_user"
     )
 
-    user_df = df_feat[df_feat["username"] == username].sort_values("week")
+    user_df = load_user_features(username)
     latest = user_df.iloc[-1]
 
     if latest.get("drift_flag", 0):
@@ -232,11 +302,17 @@ if menu == "Dashboard":
 elif menu == "Leaderboard":
     st.header("🏆 Leaderboard")
 
-    _, df_feat = load_data()
-    if df_feat.empty:
+    last_rows = load_latest_features()
+    if last_rows.empty:
         st.warning("No data.")
     else:
-        last_rows = df_feat.groupby("username").tail(1)
+        preds = load_predictions()
+        if not preds.empty:
+            last_rows = last_rows.assign(
+                username=last_rows["username"].astype(str)
+            ).merge(
+                preds[["username", "predicted_growth"]], on="username", how="left"
+            )
         st.dataframe(
             last_rows.sort_values("total_solved", ascending=False)
         )
@@ -248,14 +324,16 @@ elif menu == "Leaderboard":
 elif menu == "Visual Charts":
     st.header("📊 Visual Charts")
 
-    _, df_feat = load_data()
-    if df_feat.empty:
+    users = load_usernames()
+    if not users:
         st.warning("No data.")
     else:
-        username = st.selectbox("Select user", df_feat["username"].unique())
-        df = df_feat[df_feat["username"] == username]
-        st.pyplot(plot_weekly_progress(df))
-        st.pyplot(plot_growth_curve(df))
+        username = st.selectbox("Select user", users)
+        df = load_user_features(username)
+        weekly, _ = load_rollups(username)
+        weekly_df = df if weekly.empty else weekly
+        st.pyplot(plot_weekly_progress(weekly_df))
+        st.pyplot(plot_growth_curve(weekly_df))
         st.pyplot(plot_growth_with_drift(df))
 
 # -----------------------------
@@ -264,14 +342,12 @@ elif menu == "Visual Charts":
 elif menu == "Advanced Charts":
     st.header("📊 Advanced Analytics Suite")
 
-    df_data, df_feat = load_data()
+    users = load_usernames()
 
-    if df_feat.empty:
+    if not users:
         st.warning("No feature data available.")
         st.stop()
 
-    users = sorted(df_feat["username"].unique())
-
     # -----------------------------
     # User Comparison
     # -----------------------------
@@ -284,7 +360,10 @@ elif menu == "Advanced Charts":
     if user1 == user2:
         st.warning("Please select two different users.")
     else:
-        st.pyplot(plot_user_comparison(df_feat, user1, user2))
+        st.pyplot(plot_user_comparison(
+            pd.concat([load_user_features(user1), load_user_features(user2)]),
+            user1, user2
+        ))
 
     st.markdown("---")
 
@@ -294,7 +373,7 @@ elif menu == "Advanced Charts":
     st.subheader("🎯 Difficulty Ratio (Latest Week)")
     current_user = st.selectbox("Select User for Difficulty Chart", users, key="diff_user")
 
-    user_df = df_feat[df_feat["username"] == current_user].sort_values("week")
+    user_df = load_user_features(current_user)
     st.pyplot(plot_difficulty_ratio(user_df))
 
     st.markdown("---")
@@ -303,7 +382,8 @@ elif menu == "Advanced Charts":
     # Weekly Solved Breakdown
     # -----------------------------
     st.subheader("📦 Weekly Problem Breakdown")
-    st.pyplot(plot_weekly_breakdown(user_df))
+    weekly, _ = load_rollups(current_user)
+    st.pyplot(plot_weekly_breakdown(user_df if weekly.empty else weekly))
 
     st.markdown("---")
 
@@ -344,12 +424,22 @@ elif menu == "Advanced Charts":
 # -----------------------------
 elif menu == "Predict Next Week":
     st.header("🤖 Predict Growth")
-    _, df_feat = load_data()
+    users = load_usernames()
 
-    if df_feat.empty:
+    if not users:
         st.warning("No data.")
     else:
-        username = st.selectbox("Select user", df_feat["username"].unique())
+        username = st.selectbox("Select user", users)
+
+        preds = load_predictions()
+        row = preds[preds["username"] == username] if not preds.empty else preds
+        if not row.empty:
+            p = row.iloc[0]
+            st.info(
+                f"Forecast: {p['predicted_growth']:.2f} "
+                f"(model {p['model_version']}, {p['predicted_at']:%Y-%m-%d %H:%M} UTC)"
+            )
+
         if st.button("Predict"):
             pred = predict_for_username(username)
             st.success(f"Prediction: {pred:.2f}")
@@ -442,10 +532,12 @@ elif menu == "Run Pipeline":
         st.error("Admin access required.")
         st.stop()
 
+    force_fetch = st.checkbox("Re-fetch all profiles (ignore schedule)")
+
     if st.button("Run Now"):
         with st.spinner("Running pipeline..."):
             try:
-                run_full_pipeline()
+                run_full_pipeline(force_fetch=force_fetch)
                 st.success("Pipeline completed!")
                 st.cache_data.clear()
             except Exception as e:
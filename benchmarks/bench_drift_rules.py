@@ -0,0 +1,89 @@
+# benchmarks/bench_drift_rules.py
+"""
+Throughput of the vectorized drift rules vs. the original row-by-row
+inactivity loop (run on a sample, it is far too slow for millions).
+
+    python -m benchmarks.bench_drift_rules --users 20000 --days 100
+"""
+import time
+import json
+import argparse
+
+import numpy as np
+
+from benchmarks.synthetic import generate_snapshots
+from pipeline.drift_rules import apply_drift_rules, inactivity_streak
+
+
+def legacy_inactivity(df):
+    """The loop previously in engineer()."""
+    df = df.copy()
+    df["inactive_weeks"] = 0
+    for user, group in df.groupby("username"):
+        inactive = 0
+        for idx in group.index:
+            if df.loc[idx, "weekly_growth"] == 0:
+                inactive += 1
+            else:
+                inactive = 0
+            df.loc[idx, "inactive_weeks"] = inactive
+    return df["inactive_weeks"]
+
+
+def prepare(df):
+    """Just the growth columns the rules read."""
+    by = df.groupby("username", sort=False)
+    df["weekly_growth"] = df["total_solved"] - by["total_solved"].shift(1).fillna(0)
+    df["prev_weekly_growth"] = df.groupby("username", sort=False)["weekly_growth"].shift(1)
+    df["rolling_growth_3week"] = (
+        df.groupby("username", sort=False)["weekly_growth"]
+          .rolling(3).mean().reset_index(0, drop=True).fillna(0)
+    )
+    return df
+
+
+def run(users, days, legacy_users):
+    df = prepare(generate_snapshots(users, days))
+
+    start = time.perf_counter()
+    apply_drift_rules(df)
+    elapsed = time.perf_counter() - start
+
+    result = {
+        "rows": len(df),
+        "rules_seconds": round(elapsed, 3),
+        "rules_rows_per_sec": int(len(df) / elapsed),
+        "drift_rows": int(df["drift_flag"].sum()),
+    }
+
+    if legacy_users:
+        sample = prepare(generate_snapshots(legacy_users, days, seed=7))
+
+        start = time.perf_counter()
+        old = legacy_inactivity(sample)
+        legacy_elapsed = time.perf_counter() - start
+
+        new = inactivity_streak(sample)
+        result.update({
+            "legacy_rows": len(sample),
+            "legacy_rows_per_sec": int(len(sample) / legacy_elapsed),
+            "legacy_parity": bool(np.array_equal(old.to_numpy(), new.to_numpy())),
+        })
+
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=20000)
+    parser.add_argument("--days", type=int, default=100)
+    parser.add_argument("--legacy-users", type=int, default=100)
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+
+    result = run(args.users, args.days, args.legacy_users)
+    print(json.dumps(result, indent=2))
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(result, f, indent=2)
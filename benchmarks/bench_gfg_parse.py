@@ -0,0 +1,83 @@
+# benchmarks/bench_gfg_parse.py
+"""
+GFG score-card extraction: BeautifulSoup tree (previous implementation)
+vs. the streaming extract_score_card fast path.
+
+    python -m benchmarks.bench_gfg_parse [--repeat 50] [--json out.json]
+"""
+import os
+import glob
+import json
+import time
+import argparse
+import tracemalloc
+
+from utils.gfg_api import extract_score_card
+
+FIXTURE_DIR = os.path.join(os.path.dirname(__file__), "fixtures", "gfg")
+
+
+def legacy_extract(html: str) -> str | None:
+    """The original full-tree parse."""
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, "html.parser")
+    tag = soup.find("div", class_="score_card_value")
+    return tag.text if tag else None
+
+
+def _measure(fn, html, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn(html)
+    per_call = (time.perf_counter() - start) / repeat
+
+    tracemalloc.start()
+    fn(html)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return result, per_call, peak
+
+
+def run(repeat=50):
+    results = []
+
+    for path in sorted(glob.glob(os.path.join(FIXTURE_DIR, "*.html"))):
+        with open(path, encoding="utf-8") as f:
+            html = f.read()
+
+        old_val, old_t, old_mem = _measure(legacy_extract, html, repeat)
+        new_val, new_t, new_mem = _measure(extract_score_card, html, repeat)
+
+        results.append({
+            "fixture": os.path.basename(path),
+            "bytes": len(html),
+            "match": (old_val or "").strip() == (new_val or "").strip(),
+            "legacy_ms": round(old_t * 1000, 3),
+            "fast_ms": round(new_t * 1000, 3),
+            "speedup": round(old_t / new_t, 1) if new_t else None,
+            "legacy_peak_kb": round(old_mem / 1024, 1),
+            "fast_peak_kb": round(new_mem / 1024, 1),
+        })
+
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+
+    rows = run(args.repeat)
+    for r in rows:
+        print(
+            f"{r['fixture']:<22} {r['bytes']:>8}B  match={r['match']}  "
+            f"legacy {r['legacy_ms']:>8}ms / {r['legacy_peak_kb']:>8}KB  "
+            f"fast {r['fast_ms']:>7}ms / {r['fast_peak_kb']:>6}KB  x{r['speedup']}"
+        )
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(rows, f, indent=2)
@@ -0,0 +1,224 @@
+# benchmarks/bench_pipeline.py
+"""
+End-to-end pipeline timings at several scales, against a throwaway
+local Postgres and the stub platform API.
+
+    export DB_HOST=127.0.0.1 DB_PORT=5432 DB_USER=postgres \\
+           DB_PASSWORD=postgres DB_NAME=dsa_bench DB_SSLMODE=disable
+    python -m benchmarks.bench_pipeline --scales 100x14,1000x28 --json bench.json
+
+Each scale wipes the benchmark database, loads N users × D days of
+synthetic history, then times run_fetch (today's snapshot for every
+user from the stub), engineer (full + incremental), train,
+predict_for_username and the visualize plotters.
+The database name must contain "bench" unless --force is given, and
+D may not exceed RETENTION_DAYS: run_fetch would otherwise spend the
+timed section deleting the oldest history.
+"""
+import os
+import sys
+import json
+import time
+import tempfile
+import argparse
+import datetime as dt
+import subprocess
+
+from sqlalchemy import text
+
+# Measure the pipeline, not the disk cache / rate limiter / archive
+os.environ.setdefault("HTTP_CACHE_TTL", "0")
+os.environ.setdefault("HTTP_CACHE_DIR", tempfile.mkdtemp(prefix="dsa_bench_cache_"))
+os.environ.setdefault("RAW_ARCHIVE_ENABLED", "0")
+os.environ.setdefault("LEETCODE_RATE_LIMIT", "0")
+os.environ.setdefault("FETCH_PLATFORMS", "leetcode")
+
+BENCH_TABLES = [
+    "dsa_data", "dsa_features", "dsa_weekly", "dsa_monthly",
+    "feature_fingerprints", "fetch_schedule", "codeforces_sync",
+    "platform_profiles", "users",
+]
+
+# Users sampled for the per-user timings (predict, plotters)
+SAMPLE_USERS = 20
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], text=True, stderr=subprocess.DEVNULL
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _timed(timings, name, fn, *args, **kwargs):
+    start = time.perf_counter()
+    out = fn(*args, **kwargs)
+    timings[name] = round(time.perf_counter() - start, 4)
+    return out
+
+
+def load_scale(engine, users, days):
+    """
+    Wipe the benchmark tables and load synthetic users + history, with
+    the weekly/monthly rollups rebuilt to match.
+    """
+    from benchmarks.synthetic import generate_snapshots
+    from database import RETENTION_DAYS
+    from pipeline.bulk_writer import write_frame
+    from pipeline.rollups import rebuild_rollups
+
+    if days > RETENTION_DAYS:
+        raise ValueError(
+            f"{days} days of history exceeds RETENTION_DAYS={RETENTION_DAYS}"
+        )
+
+    # history ends yesterday; run_fetch adds today
+    start = dt.date.today() - dt.timedelta(days=days)
+    history = generate_snapshots(users, days, start=start)
+    names = history["username"].unique().tolist()
+
+    with engine.begin() as conn:
+        conn.exec_driver_sql(f"TRUNCATE {', '.join(BENCH_TABLES)} CASCADE")
+        conn.execute(
+            text("INSERT INTO users (username, password_hash) VALUES (:u, 'x')"),
+            [{"u": u} for u in names]
+        )
+        conn.execute(
+            text("""
+                INSERT INTO platform_profiles (username, platform, platform_username)
+                VALUES (:u, 'leetcode', :u)
+            """),
+            [{"u": u} for u in names]
+        )
+
+    write_frame(engine, history, "dsa_data")
+    with engine.begin() as conn:
+        rebuild_rollups(conn)
+    return names
+
+
+def time_plotters(engine, names):
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    import visualize
+    from pipeline.rollups import load_rollup
+    from pipeline.schema import read_table
+
+    feats = read_table(
+        engine, "dsa_features",
+        where="username = ANY(:users)", params={"users": names}
+    )
+    weekly = load_rollup(engine, "weekly")
+
+    plotters = {
+        "plot_weekly_progress": (visualize.plot_weekly_progress, weekly),
+        "plot_growth_curve": (visualize.plot_growth_curve, weekly),
+        "plot_weekly_breakdown": (visualize.plot_weekly_breakdown, weekly),
+        "plot_difficulty_ratio": (visualize.plot_difficulty_ratio, feats),
+        "plot_hard_density": (visualize.plot_hard_density, feats),
+        "plot_rolling_growth": (visualize.plot_rolling_growth, feats),
+    }
+
+    timings = {}
+    for name, (fn, df) in plotters.items():
+        start = time.perf_counter()
+        for user in names:
+            plt.close(fn(df[df["username"] == user]))
+        timings[name] = round((time.perf_counter() - start) / len(names), 4)
+    return timings
+
+
+def run_scale(engine, users, days):
+    from pipeline.fetch_data import run_fetch
+    from pipeline.feature_engineering import engineer
+    from pipeline.train_model import train
+    from pipeline.predict import predict_for_username
+
+    timings = {}
+    names = _timed(timings, "load_history", load_scale, engine, users, days)
+    sample = names[:SAMPLE_USERS]
+
+    _timed(timings, "run_fetch", run_fetch, force_all=True)
+    _timed(timings, "engineer_full", engineer, full_rebuild=True)
+    _timed(timings, "engineer_incremental", engineer)
+    _timed(timings, "train", train)
+
+    start = time.perf_counter()
+    for user in sample:
+        predict_for_username(user)
+    timings["predict_per_user"] = round((time.perf_counter() - start) / len(sample), 4)
+
+    timings["plotters_per_user"] = time_plotters(engine, sample)
+
+    with engine.connect() as conn:
+        rows = {
+            t: conn.execute(text(f"SELECT COUNT(*) FROM {t}")).scalar()
+            for t in ("dsa_data", "dsa_features", "dsa_weekly")
+        }
+
+    return {"users": users, "days": days, "rows": rows, "seconds": timings}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scales", default="100x14,1000x28",
+                        help="comma separated USERSxDAYS")
+    parser.add_argument("--latency", type=float, default=0.0,
+                        help="stub API latency per request (seconds)")
+    parser.add_argument("--json", help="write results to this file")
+    parser.add_argument("--force", action="store_true",
+                        help="allow a database whose name lacks 'bench'")
+    args = parser.parse_args()
+
+    if "bench" not in os.getenv("DB_NAME", "") and not args.force:
+        sys.exit("DB_NAME must name a throwaway benchmark database (or pass --force)")
+
+    from database import RETENTION_DAYS
+
+    scales = [
+        tuple(int(x) for x in scale.lower().split("x"))
+        for scale in args.scales.split(",")
+    ]
+    too_long = [f"{u}x{d}" for u, d in scales if d > RETENTION_DAYS]
+    if too_long:
+        sys.exit(
+            f"scales {', '.join(too_long)} exceed RETENTION_DAYS={RETENTION_DAYS}; "
+            "raise RETENTION_DAYS or shorten the history"
+        )
+
+    from benchmarks.stub_server import start_stub_server
+
+    server, base_url = start_stub_server(latency=args.latency)
+    os.environ["LEETCODE_API_URL"] = f"{base_url}/leetcode"
+
+    from database import get_engine, init_tables_and_migrate
+
+    init_tables_and_migrate()
+    engine = get_engine()
+
+    results = {
+        "commit": git_commit(),
+        "started_at": dt.datetime.utcnow().isoformat(timespec="seconds"),
+        "stub_latency": args.latency,
+        "scales": [],
+    }
+    try:
+        for users, days in scales:
+            print(f"[bench] {users} users x {days} days")
+            results["scales"].append(run_scale(engine, users, days))
+    finally:
+        engine.dispose()
+        server.shutdown()
+
+    print(json.dumps(results, indent=2))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+# benchmarks/bench_sql_features.py
+"""
+Parity + timing of the SQL-pushdown feature engine against the pandas
+engine, on an in-memory SQLite copy of synthetic dsa_data.
+
+    python -m benchmarks.bench_sql_features --users 2000 --days 60
+"""
+import math
+import time
+import json
+import sqlite3
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.synthetic import generate_snapshots
+from pipeline.feature_engineering import compute_features
+from pipeline.sql_features import FEATURE_COLUMNS, features_select_sql
+
+BOOL_COLS = ["sudden_drop", "declining_trend", "drift_flag"]
+
+
+def sqlite_connect():
+    conn = sqlite3.connect(":memory:")
+    # SQLite builds without math functions have no sqrt()
+    try:
+        conn.execute("SELECT sqrt(4)")
+    except sqlite3.OperationalError:
+        conn.create_function("sqrt", 1, math.sqrt, deterministic=True)
+    return conn
+
+
+def compare(sql_df, pandas_df):
+    """Column → number of mismatching rows (floats compared with tolerance)."""
+    mismatches = {}
+    for col in FEATURE_COLUMNS:
+        a, b = sql_df[col], pandas_df[col]
+        if col in BOOL_COLS:
+            equal = a.astype(bool).to_numpy() == b.astype(bool).to_numpy()
+        elif col == "drift_reason":
+            equal = a.fillna("").to_numpy() == b.fillna("").to_numpy()
+        elif col in ("username", "date", "week_start_date"):
+            equal = a.astype(str).str[:10].to_numpy() == b.astype(str).str[:10].to_numpy()
+        else:
+            equal = np.isclose(
+                a.astype(float), b.astype(float), rtol=1e-9, atol=1e-9, equal_nan=True
+            )
+        bad = int((~equal).sum())
+        if bad:
+            mismatches[col] = bad
+    return mismatches
+
+
+def run(users, days):
+    raw = generate_snapshots(users, days)
+    raw["date"] = raw["date"].astype(str)
+    raw["week_start_date"] = raw["week_start_date"].astype(str)
+
+    conn = sqlite_connect()
+    raw.to_sql("dsa_data", conn, index=False)
+
+    start = time.perf_counter()
+    sql_df = pd.read_sql(
+        f"SELECT * FROM ({features_select_sql()}) ORDER BY username, date", conn
+    )
+    sql_elapsed = time.perf_counter() - start
+
+    start = time.perf_counter()
+    pandas_df = compute_features(raw.copy()).reset_index(drop=True)
+    pandas_elapsed = time.perf_counter() - start
+
+    mismatches = compare(sql_df, pandas_df)
+    return {
+        "rows": len(raw),
+        "sql_seconds": round(sql_elapsed, 3),
+        "pandas_seconds": round(pandas_elapsed, 3),
+        "parity": not mismatches,
+        "mismatches": mismatches,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--days", type=int, default=60)
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+
+    result = run(args.users, args.days)
+    print(json.dumps(result, indent=2))
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(result, f, indent=2)
+
+    raise SystemExit(0 if result["parity"] else 1)
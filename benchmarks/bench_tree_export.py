@@ -0,0 +1,139 @@
+# benchmarks/bench_tree_export.py
+"""
+Forest export vs. the pickled scikit-learn model: prediction parity,
+load time, resident memory and predict latency.
+
+    python -m benchmarks.bench_tree_export --users 2000 --days 60 --trees 200
+
+Each side is loaded in a fresh subprocess so import cost and memory are
+measured in isolation; memory is the growth of VmRSS across the load
+and predictions (Linux).
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import subprocess
+
+import numpy as np
+
+from benchmarks.synthetic import generate_snapshots
+from pipeline.feature_engineering import compute_features
+from pipeline.schema import apply_schema
+from pipeline.train_model import FEATURE_COLS
+
+# Runs in a subprocess: load one artifact and time it
+PROBE = r"""
+import json, sys, time
+import numpy as np
+
+def rss_mb():
+    # current resident set (ru_maxrss is a peak, inherited across exec)
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+
+kind, path, x_path = sys.argv[1:4]
+X = np.load(x_path)
+rss0 = rss_mb()
+
+start = time.perf_counter()
+if kind == "sklearn":
+    import joblib
+    model = joblib.load(path)
+else:
+    from pipeline.tree_export import load_forest
+    model = load_forest(path)
+load = time.perf_counter() - start
+
+start = time.perf_counter()
+for row in X[:50]:
+    model.predict(row.reshape(1, -1))
+single = (time.perf_counter() - start) / 50
+
+start = time.perf_counter()
+pred = model.predict(X)
+batch = time.perf_counter() - start
+
+rss1 = rss_mb()
+
+np.save(x_path.replace(".npy", f".{kind}.pred.npy"), pred)
+print(json.dumps({
+    "load_seconds": round(load, 4),
+    "predict_one_ms": round(single * 1000, 3),
+    "predict_batch_seconds": round(batch, 4),
+    "rss_mb_over_baseline": round(rss1 - rss0, 1),
+    "sklearn_imported": "sklearn" in sys.modules,
+}))
+"""
+
+
+def _probe(kind, path, x_path):
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    out = subprocess.check_output(
+        [sys.executable, "-c", PROBE, kind, path, x_path],
+        cwd=root, text=True
+    )
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def run(users, days, trees):
+    import joblib
+    from sklearn.ensemble import RandomForestRegressor
+    from pipeline.tree_export import export_forest
+
+    df = compute_features(apply_schema(generate_snapshots(users, days), "dsa_data"))
+    X = df[FEATURE_COLS].fillna(0).to_numpy(dtype=np.float32)
+    y = df["weekly_growth"].to_numpy(dtype=np.float64)
+
+    model = RandomForestRegressor(n_estimators=trees, n_jobs=-1, random_state=42)
+    model.fit(X, y)
+
+    tmp = tempfile.mkdtemp(prefix="dsa_tree_export_")
+    pkl_path = os.path.join(tmp, "model.pkl")
+    npz_path = os.path.join(tmp, "forest.npz")
+    x_path = os.path.join(tmp, "X.npy")
+
+    joblib.dump(model, pkl_path)
+    start = time.perf_counter()
+    nodes = export_forest(model, npz_path, "bench")
+    export_seconds = time.perf_counter() - start
+    np.save(x_path, X)
+
+    result = {
+        "rows": len(X),
+        "trees": trees,
+        "nodes": nodes,
+        "export_seconds": round(export_seconds, 3),
+        "pickle_mb": round(os.path.getsize(pkl_path) / 1e6, 2),
+        "npz_mb": round(os.path.getsize(npz_path) / 1e6, 2),
+        "sklearn": _probe("sklearn", pkl_path, x_path),
+        "numpy": _probe("numpy", npz_path, x_path),
+    }
+
+    ref = np.load(x_path.replace(".npy", ".sklearn.pred.npy"))
+    got = np.load(x_path.replace(".npy", ".numpy.pred.npy"))
+    result["max_abs_diff"] = float(np.abs(ref - got).max())
+    result["parity"] = bool(np.allclose(ref, got, rtol=0, atol=1e-9))
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--days", type=int, default=60)
+    parser.add_argument("--trees", type=int, default=200)
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+
+    result = run(args.users, args.days, args.trees)
+    print(json.dumps(result, indent=2))
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(result, f, indent=2)
+
+    raise SystemExit(0 if result["parity"] else 1)
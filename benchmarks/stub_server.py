@@ -0,0 +1,152 @@
+# benchmarks/stub_server.py
+"""
+Local stand-in for leetcode-stats-api and the Codeforces API.
+
+Run it, then point the adapters at it:
+
+    python -m benchmarks.stub_server --port 8765 --latency 0.2
+    export LEETCODE_API_URL=http://127.0.0.1:8765/leetcode
+    export CODEFORCES_API_URL=http://127.0.0.1:8765/codeforces/api
+    export HTTP_CACHE_TTL=0   # measure the network path, not the disk cache
+"""
+import argparse
+import hashlib
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+
+def _seed(name: str) -> int:
+    return int(hashlib.md5(name.encode()).hexdigest()[:8], 16)
+
+
+def leetcode_payload(username: str) -> dict:
+    seed = _seed(username)
+    easy, medium, hard = seed % 300, (seed // 7) % 400, (seed // 13) % 120
+    return {
+        "status": "success",
+        "easySolved": easy,
+        "mediumSolved": medium,
+        "hardSolved": hard,
+        "totalSolved": easy + medium + hard,
+    }
+
+
+def codeforces_submissions(handle: str) -> list:
+    """Newest-first submission list, like user.status."""
+    seed = _seed(handle)
+    count = 50 + seed % 250
+    subs = []
+    for i in range(count, 0, -1):
+        subs.append({
+            "id": seed % 100000 * 1000 + i,
+            "problem": {"contestId": 1000 + (i * 7) % 900, "index": "ABCDEF"[i % 6]},
+            "verdict": "OK" if i % 3 else "WRONG_ANSWER",
+        })
+    return subs
+
+
+def codeforces_problemset() -> dict:
+    problems = []
+    for contest in range(1000, 1900):
+        for n, index in enumerate("ABCDEF"):
+            problem = {"contestId": contest, "index": index, "name": f"{contest}{index}"}
+            if contest % 50:
+                problem["rating"] = 800 + n * 400 + (contest % 3) * 100
+            problems.append(problem)
+    return {"problems": problems, "problemStatistics": []}
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    latency = 0.0
+    fail_users = frozenset()
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status: int, body: dict):
+        raw = json.dumps(body).encode()
+        etag = f'"{hashlib.md5(raw).hexdigest()}"'
+
+        if status == 200 and self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+
+        self.send_response(status)
+        self.send_header("ETag", etag)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(raw)))
+        self.end_headers()
+        self.wfile.write(raw)
+
+    def do_GET(self):
+        if self.latency:
+            time.sleep(self.latency)
+
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        parts = [p for p in url.path.split("/") if p]
+
+        if len(parts) == 2 and parts[0] == "leetcode":
+            if parts[1] in self.fail_users:
+                return self._send(200, {"status": "error", "message": "user does not exist"})
+            return self._send(200, leetcode_payload(parts[1]))
+
+        if parts[:2] == ["codeforces", "api"] and parts[2:] == ["user.status"]:
+            handle = query.get("handle", [""])[0]
+            if not handle or handle in self.fail_users:
+                return self._send(400, {"status": "FAILED", "comment": "handle not found"})
+            subs = codeforces_submissions(handle)
+            if "from" in query:
+                start = int(query["from"][0]) - 1
+                subs = subs[start:start + int(query.get("count", [len(subs)])[0])]
+            return self._send(200, {"status": "OK", "result": subs})
+
+        if parts[:2] == ["codeforces", "api"] and parts[2:] == ["user.info"]:
+            handles = query.get("handles", [""])[0].split(";")
+            if any(h in self.fail_users for h in handles):
+                return self._send(400, {"status": "FAILED", "comment": "handles: not found"})
+            # every other handle has been "online" recently
+            return self._send(200, {"status": "OK", "result": [
+                {"handle": h, "lastOnlineTimeSeconds": 0 if _seed(h) % 2 else int(time.time())}
+                for h in handles
+            ]})
+
+        if parts[:2] == ["codeforces", "api"] and parts[2:] == ["problemset.problems"]:
+            return self._send(200, {"status": "OK", "result": codeforces_problemset()})
+
+        self._send(404, {"status": "error", "message": "not found"})
+
+
+def start_stub_server(port: int = 0, latency: float = 0.0, fail_users=()):
+    """
+    Start the stub on a daemon thread.
+    Returns (server, base_url); call server.shutdown() when done.
+    """
+    handler = type("Handler", (StubHandler,), {
+        "latency": latency,
+        "fail_users": frozenset(fail_users),
+    })
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stub platform API server")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0)
+    args = parser.parse_args()
+
+    server, base = start_stub_server(args.port, args.latency)
+    print(f"export LEETCODE_API_URL={base}/leetcode")
+    print(f"export CODEFORCES_API_URL={base}/codeforces/api")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
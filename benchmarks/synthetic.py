@@ -0,0 +1,48 @@
+# benchmarks/synthetic.py
+"""
+Synthetic dsa_data snapshots: N users × D days of cumulative solve
+counts with active streaks, idle stretches and occasional corrections.
+"""
+import datetime as dt
+
+import numpy as np
+import pandas as pd
+
+
+def generate_snapshots(n_users: int, n_days: int, seed: int = 42,
+                       start: dt.date = dt.date(2026, 1, 1)) -> pd.DataFrame:
+    """
+    One row per user per day, sorted by (username, date), with the
+    dsa_data columns (no id).
+    """
+    rng = np.random.default_rng(seed)
+    shape = (n_users, n_days)
+
+    # per-user activity level; some users go idle for long stretches
+    activity = rng.beta(2, 3, size=(n_users, 1))
+    idle = rng.random(shape) < 0.15
+    idle = np.maximum.accumulate(idle & (rng.random((n_users, 1)) < 0.3), axis=1) | idle
+    active = (rng.random(shape) < activity) & ~idle
+
+    easy = np.cumsum(active * rng.poisson(1.2, shape), axis=1)
+    medium = np.cumsum(active * rng.poisson(0.8, shape), axis=1)
+    hard = np.cumsum(active * rng.poisson(0.2, shape), axis=1)
+
+    # rare downward corrections (e.g. platform recounts)
+    correction = (rng.random(shape) < 0.01) * rng.integers(1, 4, shape)
+    easy = np.maximum(easy - np.cumsum(correction, axis=1), 0)
+
+    day_idx = np.tile(np.arange(n_days), n_users)
+    dates = pd.to_datetime(start) + pd.to_timedelta(day_idx, unit="D")
+    week = day_idx // 7 + 1
+
+    return pd.DataFrame({
+        "username": np.repeat([f"user{u:06d}" for u in range(n_users)], n_days),
+        "week": week,
+        "week_start_date": (pd.to_datetime(start) + pd.to_timedelta((week - 1) * 7, unit="D")).date,
+        "date": dates.date,
+        "easy_solved": easy.ravel(),
+        "medium_solved": medium.ravel(),
+        "hard_solved": hard.ravel(),
+        "total_solved": (easy + medium + hard).ravel(),
+    })
@@ -1,9 +1,19 @@
 # database.py
 import os
+import datetime as dt
 import pandas as pd
 from sqlalchemy import create_engine, text
 from sqlalchemy.exc import OperationalError
 
+from pipeline.partitions import PARTITIONED_TABLES, is_partitioned, maintain_partitions
+from pipeline.rollups import create_rollup_tables, rebuild_rollups
+
+# Create dsa_data / dsa_features as daily range partitions (new tables only;
+# existing unpartitioned tables are left as they are)
+DSA_PARTITIONED = os.getenv("DSA_PARTITIONED", "0") == "1"
+
+# Days of snapshots kept by run_fetch
+RETENTION_DAYS = int(os.getenv("RETENTION_DAYS", "30"))
 
 
 def get_engine():
@@ -16,10 +26,13 @@ def get_engine():
     if not all([host, user, password, port, db]):
         raise RuntimeError("Database environment variables missing!")
 
+    # "disable" for a local / throwaway Postgres (benchmarks)
+    sslmode = os.getenv("DB_SSLMODE", "require")
+
     url = (
         f"postgresql+psycopg2://{user}:{password}"
         f"@{host}:{port}/{db}"
-        "?sslmode=require"
+        f"?sslmode={sslmode}"
     )
 
     return create_engine(
@@ -30,6 +43,52 @@ def get_engine():
     )
 
 
+_shared_engine = None
+_shared_engine_pid = None
+
+
+def get_shared_engine():
+    """
+    One pooled engine per process for hot paths (predictions) that
+    shouldn't pay a connect per call. Never dispose it; a forked child
+    gets its own engine.
+    """
+    global _shared_engine, _shared_engine_pid
+
+    if _shared_engine is None or _shared_engine_pid != os.getpid():
+        _shared_engine = get_engine()
+        _shared_engine_pid = os.getpid()
+    return _shared_engine
+
+
+
+# Drift columns added to dsa_features after the original schema
+FEATURE_DRIFT_COLUMNS = {
+    "week_start_date": "DATE",
+    "prev_weekly_growth": "INT",
+    "inactive_weeks": "INT DEFAULT 0",
+    "sudden_drop": "BOOLEAN",
+    "declining_trend": "BOOLEAN",
+    "drift_flag": "BOOLEAN",
+    "drift_reason": "VARCHAR(100)"
+}
+
+
+def ensure_feature_columns(conn):
+    """
+    Add the drift columns to dsa_features if missing; both feature
+    engines call this before writing.
+    """
+    for col, dtype in FEATURE_DRIFT_COLUMNS.items():
+        conn.exec_driver_sql(
+            f"ALTER TABLE dsa_features ADD COLUMN IF NOT EXISTS {col} {dtype}"
+        )
+
+
+def _index_exists(conn, name) -> bool:
+    return bool(conn.execute(
+        text("SELECT to_regclass(:i) IS NOT NULL"), {"i": name}
+    ).scalar())
 
 
 def init_tables_and_migrate():
@@ -40,63 +99,186 @@ def init_tables_and_migrate():
         # =============================================================
         # BASE TABLE: dsa_data
         # =============================================================
+        if DSA_PARTITIONED:
+            conn.exec_driver_sql("""
+                CREATE TABLE IF NOT EXISTS dsa_data (
+                    id BIGINT GENERATED ALWAYS AS IDENTITY,
+                    username VARCHAR(100),
+                    week INT,
+                    easy_solved INT,
+                    medium_solved INT,
+                    hard_solved INT,
+                    total_solved INT,
+                    date DATE NOT NULL,
+                    PRIMARY KEY (id, date)
+                ) PARTITION BY RANGE (date);
+            """)
+        else:
+            conn.exec_driver_sql("""
+                CREATE TABLE IF NOT EXISTS dsa_data (
+                    id BIGINT GENERATED ALWAYS AS IDENTITY PRIMARY KEY,
+                    username VARCHAR(100),
+                    week INT,
+                    easy_solved INT,
+                    medium_solved INT,
+                    hard_solved INT,
+                    total_solved INT
+                );
+            """)
+
+
+        # Add date / week columns
         conn.exec_driver_sql("""
-            CREATE TABLE IF NOT EXISTS dsa_data (
-                id BIGINT GENERATED ALWAYS AS IDENTITY PRIMARY KEY,
-                username VARCHAR(100),
-                week INT,
-                easy_solved INT,
-                medium_solved INT,
-                hard_solved INT,
-                total_solved INT
-            );
+            ALTER TABLE dsa_data
+            ADD COLUMN IF NOT EXISTS date DATE
+        """)
+        conn.exec_driver_sql("""
+            ALTER TABLE dsa_data
+            ADD COLUMN IF NOT EXISTS week_start_date DATE
         """)
 
+        # One snapshot per user per day (backs ON CONFLICT upserts).
+        # Drop older duplicates first so the index can be built; once it
+        # exists there can't be any, so this runs a single time.
+        if not _index_exists(conn, "uq_dsa_data_username_date"):
+            conn.exec_driver_sql("""
+                DELETE FROM dsa_data a
+                USING dsa_data b
+                WHERE a.username = b.username
+                  AND a.date = b.date
+                  AND a.id < b.id
+            """)
+            conn.exec_driver_sql("""
+                CREATE UNIQUE INDEX IF NOT EXISTS uq_dsa_data_username_date
+                ON dsa_data (username, date)
+            """)
 
-        # Add date column
-        
 
         # =============================================================
         # dsa_features
         # =============================================================
+        if DSA_PARTITIONED:
+            conn.exec_driver_sql("""
+                CREATE TABLE IF NOT EXISTS dsa_features (
+                    id BIGINT GENERATED ALWAYS AS IDENTITY,
+                    username VARCHAR(100),
+                    week INT,
+                    total_solved INT,
+                    easy_solved INT,
+                    medium_solved INT,
+                    hard_solved INT,
+                    prev_total INT,
+                    prev_easy INT,
+                    prev_medium INT,
+                    prev_hard INT,
+                    weekly_growth INT,
+                    weekly_easy_growth INT,
+                    weekly_medium_growth INT,
+                    weekly_hard_growth INT,
+                    easy_ratio FLOAT,
+                    medium_ratio FLOAT,
+                    hard_ratio FLOAT,
+                    balance_score FLOAT,
+                    consistency_score FLOAT,
+                    hard_problem_density FLOAT,
+                    rolling_growth_3week FLOAT,
+                    date DATE NOT NULL,
+                    PRIMARY KEY (id, date)
+                ) PARTITION BY RANGE (date);
+            """)
+        else:
+            conn.exec_driver_sql("""
+                CREATE TABLE IF NOT EXISTS dsa_features (
+                    id BIGINT GENERATED ALWAYS AS IDENTITY PRIMARY KEY,
+                    username VARCHAR(100),
+                    week INT,
+                    total_solved INT,
+                    easy_solved INT,
+                    medium_solved INT,
+                    hard_solved INT,
+                    prev_total INT,
+                    prev_easy INT,
+                    prev_medium INT,
+                    prev_hard INT,
+                    weekly_growth INT,
+                    weekly_easy_growth INT,
+                    weekly_medium_growth INT,
+                    weekly_hard_growth INT,
+                    easy_ratio FLOAT,
+                    medium_ratio FLOAT,
+                    hard_ratio FLOAT,
+                    balance_score FLOAT,
+                    consistency_score FLOAT,
+                    hard_problem_density FLOAT,
+                    rolling_growth_3week FLOAT
+                );
+            """)
         conn.exec_driver_sql("""
-            CREATE TABLE IF NOT EXISTS dsa_features (
-                id BIGINT GENERATED ALWAYS AS IDENTITY PRIMARY KEY,
-                username VARCHAR(100),
-                week INT,
-                
-                total_solved INT,
-                easy_solved INT,
-                medium_solved INT,
-                hard_solved INT,
-                prev_total INT,
-                prev_easy INT,
-                prev_medium INT,
-                prev_hard INT,
-                weekly_growth INT,
-                weekly_easy_growth INT,
-                weekly_medium_growth INT,
-                weekly_hard_growth INT,
-                easy_ratio FLOAT,
-                medium_ratio FLOAT,
-                hard_ratio FLOAT,
-                balance_score FLOAT,
-                consistency_score FLOAT,
-                hard_problem_density FLOAT,
-                rolling_growth_3week FLOAT
-            );
+            ALTER TABLE dsa_features
+            ADD COLUMN IF NOT EXISTS date DATE
         """)
+
+        # One feature row per user per day (incremental upserts, lookups)
+        if not _index_exists(conn, "uq_dsa_features_username_date"):
+            conn.exec_driver_sql("""
+                DELETE FROM dsa_features a
+                USING dsa_features b
+                WHERE a.username = b.username
+                  AND a.date = b.date
+                  AND a.id < b.id
+            """)
+            conn.exec_driver_sql("""
+                CREATE UNIQUE INDEX IF NOT EXISTS uq_dsa_features_username_date
+                ON dsa_features (username, date)
+            """)
+
+        # Partitions covering the retention window + a week ahead
+        for table in PARTITIONED_TABLES:
+            if is_partitioned(conn, table):
+                maintain_partitions(conn, table, dt.date.today(), RETENTION_DAYS)
+
         # 🔴 ADD week_start_date if missing (Postgres-safe)
         
-        conn.exec_driver_sql("""
-            ALTER TABLE dsa_features
-            ADD COLUMN IF NOT EXISTS week_start_date DATE
-        """)
-        print("✅ Added week_start_date to dsa_features")
+        ensure_feature_columns(conn)
+        print("✅ Added week_start_date + drift columns to dsa_features")
         
 
         
 
+        # =============================================================
+        # FEATURE FINGERPRINTS (incremental engineer skip cache)
+        # =============================================================
+        conn.exec_driver_sql("""
+            CREATE TABLE IF NOT EXISTS feature_fingerprints (
+                username VARCHAR(100) PRIMARY KEY,
+                fingerprint CHAR(32) NOT NULL,
+                updated_at TIMESTAMP
+            );
+        """)
+
+
+        # =============================================================
+        # PREDICTIONS (latest forecast per user, written by predict_all)
+        # =============================================================
+        conn.exec_driver_sql("""
+            CREATE TABLE IF NOT EXISTS predictions (
+                username VARCHAR(100) PRIMARY KEY,
+                feature_date DATE,
+                predicted_growth FLOAT,
+                model_version VARCHAR(40),
+                predicted_at TIMESTAMP
+            );
+        """)
+
+
+        # =============================================================
+        # WEEKLY / MONTHLY ROLLUPS (backfilled from dsa_data once, when
+        # created; python -m pipeline.rollups --rebuild to redo it)
+        # =============================================================
+        if create_rollup_tables(conn):
+            rebuild_rollups(conn)
+
+
         # =============================================================
         # LOGIN USERS TABLE
         # =============================================================
@@ -128,6 +310,46 @@ def init_tables_and_migrate():
         """)
 
 
+        # =============================================================
+        # CODEFORCES INCREMENTAL SYNC STATE
+        # =============================================================
+        conn.exec_driver_sql("""
+            CREATE TABLE IF NOT EXISTS codeforces_sync (
+                handle VARCHAR(100) PRIMARY KEY,
+                last_submission_id BIGINT NOT NULL DEFAULT 0,
+                solved BYTEA,
+                updated_at TIMESTAMP
+            );
+        """)
+        # epoch seconds of the last check (compared to user.info lastOnline)
+        conn.exec_driver_sql("""
+            ALTER TABLE codeforces_sync
+            ADD COLUMN IF NOT EXISTS checked_at DOUBLE PRECISION
+        """)
+        # watermark held back for submissions still being judged
+        conn.exec_driver_sql("""
+            ALTER TABLE codeforces_sync
+            ADD COLUMN IF NOT EXISTS pending BOOLEAN NOT NULL DEFAULT FALSE
+        """)
+
+
+        # =============================================================
+        # FETCH SCHEDULE (next-due time per profile)
+        # =============================================================
+        conn.exec_driver_sql("""
+            CREATE TABLE IF NOT EXISTS fetch_schedule (
+                platform VARCHAR(50) NOT NULL,
+                platform_username VARCHAR(100) NOT NULL,
+                last_fetched_at TIMESTAMP,
+                last_changed_at TIMESTAMP,
+                last_total INT,
+                consecutive_failures INT NOT NULL DEFAULT 0,
+                next_due_at TIMESTAMP,
+                PRIMARY KEY (platform, platform_username)
+            );
+        """)
+
+
         # =============================================================
         # MIGRATION FROM users.txt  → leetcode_profiles
         # =============================================================
@@ -0,0 +1,156 @@
+# pipeline/bulk_writer.py
+"""
+Bulk frame writer: stage → delete → insert inside one transaction, so
+readers see either the old rows or the new ones, never a half-written
+table.
+
+PostgreSQL stages through COPY FROM STDIN (CSV); other backends
+(e.g. SQLite) stage through DataFrame.to_sql.
+
+upsert_rows() is the small-batch counterpart for keyed upserts
+(snapshots, sync state, schedule, fingerprints).
+"""
+import io
+import uuid
+
+import pandas as pd
+from sqlalchemy import text, table as sa_table, column
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+# Rows per COPY chunk (bounds the CSV buffer)
+COPY_CHUNK_ROWS = 50_000
+
+# Rows per multi-row INSERT ... VALUES statement in upsert_rows
+UPSERT_BATCH_ROWS = 500
+
+INT_TYPES = {"smallint", "integer", "bigint"}
+
+
+def _coerce_to_target(conn, df, table):
+    """
+    Float columns that land in INT columns (e.g. lags after fillna) must
+    be written as integers for COPY to accept them.
+    """
+    if conn.dialect.name != "postgresql":
+        return df
+
+    types = dict(conn.execute(
+        text("""
+            SELECT column_name, data_type
+            FROM information_schema.columns
+            WHERE table_name = :t
+        """),
+        {"t": table}
+    ).all())
+
+    df = df.copy()
+    for col in df.columns:
+        if types.get(col) in INT_TYPES and not pd.api.types.is_integer_dtype(df[col]):
+            df[col] = pd.to_numeric(df[col]).round().astype("Int64")
+    return df
+
+
+def _copy_into(conn, df, table):
+    cols = ", ".join(f'"{c}"' for c in df.columns)
+    cursor = conn.connection.cursor()
+    try:
+        for start in range(0, len(df), COPY_CHUNK_ROWS):
+            buf = io.StringIO()
+            df.iloc[start:start + COPY_CHUNK_ROWS].to_csv(buf, index=False, header=False)
+            buf.seek(0)
+            cursor.copy_expert(
+                f"COPY {table} ({cols}) FROM STDIN WITH (FORMAT csv)", buf
+            )
+    finally:
+        cursor.close()
+
+
+def stage_frame(conn, df, table) -> str:
+    """
+    Load df into a staging table shaped like `table` (df's columns only).
+    Returns the staging table name.
+
+    PostgreSQL stages into a session-private TEMP table; elsewhere the
+    stage is a regular table, so it gets a name unique to this call and
+    concurrent writers never replace each other's staging rows.
+    """
+    cols = ", ".join(f'"{c}"' for c in df.columns)
+
+    if conn.dialect.name == "postgresql":
+        stage = f"{table}_stage"
+        conn.exec_driver_sql(f"DROP TABLE IF EXISTS {stage}")
+        conn.exec_driver_sql(
+            f"CREATE TEMP TABLE {stage} ON COMMIT DROP AS "
+            f"SELECT {cols} FROM {table} WITH NO DATA"
+        )
+        _copy_into(conn, _coerce_to_target(conn, df, table), stage)
+    else:
+        stage = f"{table}_stage_{uuid.uuid4().hex[:12]}"
+        df.to_sql(stage, conn, if_exists="fail", index=False, chunksize=1000)
+
+    return stage
+
+
+def insert_frame(conn, df, table, delete_sql=None, params=None):
+    """
+    Stage df, run `delete_sql` (may reference the staging table as
+    {stage}), then INSERT ... SELECT from staging, all on `conn` inside
+    the caller's transaction.
+    """
+    if df.empty:
+        return 0
+
+    cols = ", ".join(f'"{c}"' for c in df.columns)
+    stage = stage_frame(conn, df, table)
+
+    try:
+        if delete_sql:
+            conn.execute(text(delete_sql.format(stage=stage)), params or {})
+
+        conn.exec_driver_sql(
+            f"INSERT INTO {table} ({cols}) SELECT {cols} FROM {stage}"
+        )
+    finally:
+        if conn.dialect.name != "postgresql":
+            conn.exec_driver_sql(f"DROP TABLE IF EXISTS {stage}")
+
+    return len(df)
+
+
+def upsert_rows(conn, table, rows, key_cols, batch_rows=UPSERT_BATCH_ROWS):
+    """
+    INSERT ... ON CONFLICT (key_cols) DO UPDATE for a list of dicts
+    (all with the same keys); every non-key column is updated.
+
+    Each batch of `batch_rows` rows is sent as one multi-row VALUES
+    statement, so the number of round trips grows with batches rather
+    than rows (a text() executemany is one statement per row under
+    psycopg2). A key repeated within the rows keeps its last row, since
+    one statement can't update the same row twice.
+    """
+    if not rows:
+        return 0
+
+    rows = list({tuple(r[k] for k in key_cols): r for r in rows}.values())
+    target = sa_table(table, *[column(c) for c in rows[0]])
+
+    for start in range(0, len(rows), batch_rows):
+        stmt = pg_insert(target).values(rows[start:start + batch_rows])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=key_cols,
+            set_={c: stmt.excluded[c] for c in rows[0] if c not in key_cols},
+        )
+        conn.execute(stmt)
+
+    return len(rows)
+
+
+def write_frame(engine, df, table, delete_sql=None, params=None):
+    """
+    insert_frame() in its own transaction, so readers see either the old
+    rows or the new ones.
+
+    e.g. full replace:  delete_sql="DELETE FROM dsa_features"
+    """
+    with engine.begin() as conn:
+        return insert_frame(conn, df, table, delete_sql, params)
@@ -0,0 +1,64 @@
+# pipeline/codeforces_sync.py
+"""
+Persisted per-handle Codeforces sync state (submission high-watermark +
+compressed solved set) so user.status is only read back to the last
+submission seen on the previous run.
+"""
+import datetime as dt
+
+from sqlalchemy import text
+
+from pipeline.bulk_writer import upsert_rows
+from utils.codeforces_api import encode_solved, decode_solved
+
+
+def load_sync_states(conn, handles):
+    """
+    Returns {handle: {"last_submission_id", "solved", "checked_at", "pending"}}.
+    """
+    if not handles:
+        return {}
+
+    rows = conn.execute(
+        text("""
+            SELECT handle, last_submission_id, solved, checked_at, pending
+            FROM codeforces_sync
+            WHERE handle = ANY(:handles)
+        """),
+        {"handles": list(handles)}
+    ).mappings().all()
+
+    return {
+        r["handle"]: {
+            "last_submission_id": r["last_submission_id"],
+            "solved": decode_solved(r["solved"]),
+            "checked_at": r["checked_at"],
+            "pending": bool(r["pending"]),
+        }
+        for r in rows
+    }
+
+
+def save_sync_states(conn, states):
+    """
+    Upsert {handle: state} in one batch.
+    """
+    if not states:
+        return
+
+    now = dt.datetime.utcnow()
+    upsert_rows(
+        conn, "codeforces_sync",
+        [
+            {
+                "handle": handle,
+                "last_submission_id": state["last_submission_id"],
+                "solved": encode_solved(state["solved"]),
+                "checked_at": state.get("checked_at"),
+                "pending": bool(state.get("pending")),
+                "updated_at": now,
+            }
+            for handle, state in states.items()
+        ],
+        ["handle"]
+    )
@@ -0,0 +1,118 @@
+# pipeline/drift_rules.py
+"""
+Pluggable, vectorized drift rules.
+
+A rule is a function (df) -> boolean Series registered with @drift_rule.
+It declares how many earlier raw rows it needs (`lookback`) so the
+incremental engineer loads enough history. apply_drift_rules() runs
+every registered rule; when several fire on a row, the rule registered
+last supplies drift_reason.
+
+Frames must be sorted by (username, date) and already carry the growth
+features from compute_features().
+"""
+import numpy as np
+import pandas as pd
+
+DRIFT_RULES = []
+
+
+def drift_rule(name, reason, lookback, column=None):
+    """
+    Register a rule. `column` optionally stores its flag in dsa_features.
+    """
+    def register(fn):
+        DRIFT_RULES.append({
+            "name": name,
+            "reason": reason,
+            "lookback": lookback,
+            "column": column,
+            "fn": fn,
+        })
+        return fn
+    return register
+
+
+def max_lookback() -> int:
+    return max((rule["lookback"] for rule in DRIFT_RULES), default=0)
+
+
+def _user_shift(df, col, periods=1):
+    return df.groupby("username", sort=False, observed=True)[col].shift(periods)
+
+
+def inactivity_streak(df) -> pd.Series:
+    """
+    Consecutive zero-growth rows per user, computed as run lengths.
+
+    Lookback rows (incremental mode) restart the run at their stored
+    seed_inactive_weeks, so streaks continue across runs.
+    """
+    zero = df["weekly_growth"].eq(0).to_numpy()
+    lookback = (
+        df["is_lookback"].astype(bool).to_numpy()
+        if "is_lookback" in df else np.zeros(len(df), dtype=bool)
+    )
+    seed = (
+        df["seed_inactive_weeks"].fillna(0).to_numpy()
+        if "seed_inactive_weeks" in df else np.zeros(len(df))
+    )
+
+    users = df["username"].to_numpy()
+    new_user = np.ones(len(df), dtype=bool)
+    new_user[1:] = users[1:] != users[:-1]
+
+    # a run restarts at each user, each non-zero growth and each lookback row
+    block = np.cumsum(new_user | ~zero | lookback)
+    base = pd.Series(np.where(lookback, seed, 0)).groupby(block).transform("first")
+    count = pd.Series((zero & ~lookback).astype(np.int64)).groupby(block).cumsum()
+
+    return pd.Series((base + count).to_numpy().astype(np.int64), index=df.index)
+
+
+# -------------------------------------------------
+# Rules (registration order = drift_reason priority, last wins)
+# -------------------------------------------------
+@drift_rule("inactivity", "No progress for 2+ weeks", lookback=1)
+def inactivity(df):
+    df["inactive_weeks"] = inactivity_streak(df)
+    return df["inactive_weeks"] >= 2
+
+
+@drift_rule("sudden_drop", "Sudden drop in weekly growth", lookback=3,
+            column="sudden_drop")
+def sudden_drop(df):
+    return (
+        (df["weekly_growth"] < 0) &
+        (df["weekly_growth"].abs() > 0.5 * df["rolling_growth_3week"])
+    )
+
+
+@drift_rule("declining_trend", "Consistent decline over weeks", lookback=3,
+            column="declining_trend")
+def declining_trend(df):
+    return (
+        (df["weekly_growth"] < df["prev_weekly_growth"]) &
+        (df["prev_weekly_growth"] < _user_shift(df, "weekly_growth", 2))
+    )
+
+
+def apply_drift_rules(df, rules=None):
+    """
+    Run every rule, then set drift_flag (any rule fired) and drift_reason.
+    """
+    rules = DRIFT_RULES if rules is None else rules
+
+    flag = np.zeros(len(df), dtype=bool)
+    reason = np.full(len(df), None, dtype=object)
+
+    for rule in rules:
+        fired = rule["fn"](df).fillna(False).to_numpy(dtype=bool)
+        if rule["column"]:
+            df[rule["column"]] = fired
+        flag |= fired
+        reason[fired] = rule["reason"]
+
+    df["drift_flag"] = flag
+    df["drift_reason"] = reason
+    return df
@@ -1,43 +1,253 @@
 # pipeline/feature_engineering.py
 
+import os
+from concurrent.futures import ProcessPoolExecutor
+
 import pandas as pd
 from sqlalchemy import text
-from database import get_engine
+from database import get_engine, ensure_feature_columns
+from pipeline.drift_rules import apply_drift_rules, max_lookback
+from pipeline.bulk_writer import insert_frame
+from pipeline.fingerprints import load_fingerprints, save_fingerprints
+from pipeline.schema import apply_schema, columns
+
+
+# Raw rows needed before the first new row so lags, the 3-row
+# rolling std/mean and every drift rule see full history
+LOOKBACK_ROWS = max(3, max_lookback())
+
+# Raw columns the features are computed from (schema order, no id)
+RAW_COLS = ", ".join(f"d.{c}" for c in columns("dsa_data"))
+
+# Hash shard membership (abs() on bigint: abs of the int4 minimum overflows)
+SHARD_FILTER = (
+    "(:n_shards = 1 OR abs(hashtext({col})::bigint) % :n_shards = :shard)"
+)
+
+# Loads only rows from each user's last engineered date onward, plus
+# LOOKBACK_ROWS older rows. The last engineered day is recomputed since
+# today's snapshot can be updated by a later fetch. Lookback rows carry
+# their stored inactive_weeks so the inactivity counter can continue.
+# Restricted to :users (those whose fingerprint changed).
+INCREMENTAL_SQL = f"""
+    WITH last AS (
+        SELECT username, MAX(date) AS last_date
+        FROM dsa_features
+        GROUP BY username
+    ),
+    ranked AS (
+        SELECT {RAW_COLS},
+               l.last_date,
+               ROW_NUMBER() OVER (
+                   PARTITION BY d.username, (d.date < l.last_date)
+                   ORDER BY d.date DESC
+               ) AS rn
+        FROM dsa_data d
+        LEFT JOIN last l ON l.username = d.username
+        WHERE {SHARD_FILTER.format(col="d.username")}
+          AND d.username = ANY(:users)
+    )
+    SELECT r.*,
+           COALESCE(r.date < r.last_date, FALSE) AS is_lookback,
+           f.inactive_weeks AS seed_inactive_weeks
+    FROM ranked r
+    LEFT JOIN dsa_features f
+           ON f.username = r.username
+          AND f.date = r.date
+          AND r.date < r.last_date
+    WHERE r.last_date IS NULL
+       OR r.date >= r.last_date
+       OR r.rn <= :lookback
+    ORDER BY r.username, r.date
+"""
+
+INCREMENTAL_DELETE_SQL = """
+    DELETE FROM dsa_features f
+    USING (
+        SELECT username, MIN(date) AS since
+        FROM {stage}
+        GROUP BY username
+    ) x
+    WHERE f.username = x.username
+      AND f.date >= x.since
+"""
+
+FULL_SQL = f"""
+    SELECT {RAW_COLS},
+           FALSE AS is_lookback,
+           0 AS seed_inactive_weeks
+    FROM dsa_data d
+    WHERE {SHARD_FILTER.format(col="d.username")}
+    ORDER BY d.username, d.date
+"""
+
+SHARD_DELETE_SQL = f"""
+    DELETE FROM dsa_features
+    WHERE {SHARD_FILTER.format(col="username")}
+"""
+
+HELPER_COLS = ["id", "last_date", "rn", "is_lookback", "seed_inactive_weeks"]
+
+# Number of hash shards / worker processes (1 = in-process)
+FE_SHARDS = int(os.getenv("FE_SHARDS", "1"))
+FE_WORKERS = int(os.getenv("FE_WORKERS", str(os.cpu_count() or 1)))
+
+# Raw rows per streamed chunk (chunks are extended to whole users)
+FE_CHUNK_ROWS = int(os.getenv("FE_CHUNK_ROWS", "50000"))
+
+
+def _iter_user_chunks(conn, sql, params, chunk_rows):
+    """
+    Stream query rows (ordered by username) in ~chunk_rows DataFrames
+    that never split a user: the last user of each chunk is carried
+    over into the next one.
+    """
+    carry = None
+    for chunk in pd.read_sql(text(sql), conn, params=params, chunksize=chunk_rows):
+        if carry is not None:
+            chunk = pd.concat([carry, chunk], ignore_index=True)
+
+        tail = chunk["username"] == chunk["username"].iloc[-1]
+        carry = chunk[tail]
+        if (~tail).any():
+            yield chunk[~tail].reset_index(drop=True)
+
+    if carry is not None and not carry.empty:
+        yield carry.reset_index(drop=True)
+
+
+def engineer_shard(shard, n_shards, full_rebuild=False, chunk_rows=None):
+    """
+    Engineer one hash shard of users (abs(hashtext(username)) % n_shards).
+
+    Raw rows are read through a server-side cursor in user-complete
+    chunks, so memory is bounded by the chunk size, and the shard's rows
+    are replaced in a single transaction. Opens its own engine, so it can
+    run in a worker process.
+
+    Incremental runs skip users whose raw-row fingerprint is unchanged
+    (see pipeline.fingerprints). Returns (rows written, fingerprint
+    hits, fingerprint misses).
+    """
+    engine = get_engine()
+    params = {"lookback": LOOKBACK_ROWS, "n_shards": n_shards, "shard": shard}
+    written = 0
+
+    with engine.connect().execution_options(stream_results=True) as read_conn, \
+            engine.begin() as conn:
+
+        changed, hits = load_fingerprints(
+            conn, SHARD_FILTER.format(col="username"), params
+        )
+        if full_rebuild:
+            conn.execute(text(SHARD_DELETE_SQL), params)
+            sql = FULL_SQL
+        else:
+            sql = INCREMENTAL_SQL
+            params["users"] = list(changed)
+
+        if full_rebuild or changed:
+            for chunk in _iter_user_chunks(
+                read_conn, sql, params, chunk_rows or FE_CHUNK_ROWS
+            ):
+                chunk = compute_features(apply_schema(chunk, "dsa_data"))
+                out = chunk[~chunk["is_lookback"].astype(bool)].drop(
+                    columns=HELPER_COLS, errors="ignore"
+                )
+
+                # Incremental: replace each user's rows from their first
+                # recomputed date on
+                written += insert_frame(
+                    conn, out, "dsa_features",
+                    None if full_rebuild else INCREMENTAL_DELETE_SQL
+                )
+
+        save_fingerprints(conn, changed)
+
+    engine.dispose()
+    return written, hits, len(changed)
+
+
+def engineer(full_rebuild=False, shards=None, workers=None):
+    """
+    Compute features + drift flags into dsa_features.
+
+    Incremental by default: only snapshots newer than each user's last
+    engineered date are recomputed and upserted. full_rebuild=True
+    recomputes every row (backfills, logic changes).
 
+    Users are split into `shards` hash shards (FE_SHARDS); with more than
+    one, shards run on a pool of `workers` processes (FE_WORKERS).
+    """
+    shards = max(1, shards or FE_SHARDS)
+    workers = max(1, min(shards, workers or FE_WORKERS))
 
-def engineer():
     engine = get_engine()
 
     # -------------------------------------------------
-    # Load raw data (ORDER BY username + date)
+    # Ensure Drift Columns Exist (DB safety)
     # -------------------------------------------------
-    df = pd.read_sql(
-        text("""
-            SELECT *
-            FROM dsa_data
-            ORDER BY username, date
-        """),
-        engine
-    )
+    with engine.begin() as conn:
+        ensure_feature_columns(conn)
+
+    # Workers open their own engines; don't fork live connections
+    engine.dispose()
+
+    # -------------------------------------------------
+    # Compute + write back, one transaction per shard
+    # -------------------------------------------------
+    if workers == 1:
+        counts = [
+            engineer_shard(shard, shards, full_rebuild)
+            for shard in range(shards)
+        ]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            counts = list(pool.map(
+                engineer_shard,
+                range(shards),
+                [shards] * shards,
+                [full_rebuild] * shards,
+            ))
+
+    total = sum(c[0] for c in counts)
+    hits = sum(c[1] for c in counts)
+    misses = sum(c[2] for c in counts)
+    if not full_rebuild:
+        print(f"[FE] Fingerprints: {hits} unchanged users skipped, {misses} changed")
 
-    if df.empty:
-        print("[FE] No raw data found.")
-        engine.dispose()
+    if not total:
+        print("[FE] No new snapshots to engineer.")
         return
 
+    mode = "full rebuild" if full_rebuild else "incremental"
+    print(
+        f"[FE] Feature engineering + drift detection completed "
+        f"({mode}, {total} rows, {shards} shards on {workers} workers)."
+    )
+
+
+def compute_features(df):
+    """
+    Lag, growth, ratio, rolling and drift features for raw snapshot
+    rows sorted by (username, date). Rows flagged is_lookback only
+    provide history; their inactive_weeks is taken from
+    seed_inactive_weeks instead of being recomputed (see drift_rules).
+    """
     # -------------------------------------------------
     # Ensure numeric types (safety)
     # -------------------------------------------------
     num_cols = ["easy_solved", "medium_solved", "hard_solved", "total_solved"]
-    df[num_cols] = df[num_cols].fillna(0).astype(int)
+    df[num_cols] = df[num_cols].fillna(0).astype("int32")
 
     # -------------------------------------------------
     # Lag Features
     # -------------------------------------------------
-    df["prev_total"] = df.groupby("username")["total_solved"].shift(1).fillna(0)
-    df["prev_easy"] = df.groupby("username")["easy_solved"].shift(1).fillna(0)
-    df["prev_medium"] = df.groupby("username")["medium_solved"].shift(1).fillna(0)
-    df["prev_hard"] = df.groupby("username")["hard_solved"].shift(1).fillna(0)
+    users = df.groupby("username", observed=True)
+    df["prev_total"] = users["total_solved"].shift(1).fillna(0)
+    df["prev_easy"] = users["easy_solved"].shift(1).fillna(0)
+    df["prev_medium"] = users["medium_solved"].shift(1).fillna(0)
+    df["prev_hard"] = users["hard_solved"].shift(1).fillna(0)
 
     # -------------------------------------------------
     # Growth Metrics
@@ -63,7 +273,7 @@ def engineer():
     # Consistency & Rolling Metrics
     # -------------------------------------------------
     df["consistency_score"] = (
-        df.groupby("username")["weekly_growth"]
+        df.groupby("username", observed=True)["weekly_growth"]
           .rolling(3)
           .std()
           .reset_index(0, drop=True)
@@ -73,36 +283,13 @@ def engineer():
     df["hard_problem_density"] = df["hard_solved"] / denom
 
     df["rolling_growth_3week"] = (
-        df.groupby("username")["weekly_growth"]
+        df.groupby("username", observed=True)["weekly_growth"]
           .rolling(3)
           .mean()
           .reset_index(0, drop=True)
           .fillna(0)
     )
 
-    # -------------------------------------------------
-    # Ensure Drift Columns Exist (DB safety)
-    # -------------------------------------------------
-    with engine.begin() as conn:
-        columns_to_add = {
-            "week_start_date": "DATE",
-            "prev_weekly_growth": "INT",
-            "inactive_weeks": "INT DEFAULT 0",
-            "sudden_drop": "BOOLEAN",
-            "declining_trend": "BOOLEAN",
-            "drift_flag": "BOOLEAN",
-            "drift_reason": "VARCHAR(100)"
-        }
-
-        for col, dtype in columns_to_add.items():
-            try:
-                conn.exec_driver_sql(
-                    f"ALTER TABLE dsa_features ADD COLUMN {col} {dtype}"
-                )
-                print(f"[FE] Added column: {col}")
-            except Exception:
-                pass
-
     df["week_start_date"] = pd.to_datetime(df["date"])
 
     # -------------------------------------------------
@@ -111,65 +298,10 @@ def engineer():
 
     # Previous week's growth
     df["prev_weekly_growth"] = (
-        df.groupby("username")["weekly_growth"].shift(1)
-    )
-
-    # ---- Inactivity Detection (NEW)
-    df["inactive_weeks"] = 0
-
-    for user, group in df.groupby("username"):
-        inactive = 0
-        for idx in group.index:
-            if df.loc[idx, "weekly_growth"] == 0:
-                inactive += 1
-            else:
-                inactive = 0
-            df.loc[idx, "inactive_weeks"] = inactive
-
-    # ---- Sudden Drop
-    df["sudden_drop"] = (
-        (df["weekly_growth"] < 0) &
-        (df["weekly_growth"].abs() > 0.5 * df["rolling_growth_3week"])
-    )
-
-
-    # ---- Declining Trend
-    df["declining_trend"] = (
-        (df["weekly_growth"] < df["prev_weekly_growth"]) &
-        (df["prev_weekly_growth"] <
-         df.groupby("username")["weekly_growth"].shift(2))
-    )
-
-    # ---- Final Drift Flag
-    df["drift_flag"] = (
-        (df["inactive_weeks"] >= 2) |
-        df["sudden_drop"] |
-        df["declining_trend"]
+        df.groupby("username", observed=True)["weekly_growth"].shift(1)
     )
 
-    # ---- Drift Reason encouraging clarity
-    df["drift_reason"] = None
-    df.loc[df["inactive_weeks"] >= 2, "drift_reason"] = "No progress for 2+ weeks"
-    df.loc[df["sudden_drop"], "drift_reason"] = "Sudden drop in weekly growth"
-    df.loc[df["declining_trend"], "drift_reason"] = "Consistent decline over weeks"
-
-    
-
-    # -------------------------------------------------
-    # Write back (atomic + safe)
-    # -------------------------------------------------
-    with engine.begin() as conn:
-        conn.exec_driver_sql("DELETE FROM dsa_features")
-
-    df.drop(columns=["id"], errors="ignore").to_sql(
-        "dsa_features",
-        engine,
-        if_exists="append",
-        index=False,
-        method="multi",
-        chunksize=200
-    )
-
-    engine.dispose()
-    print("[FE] Feature engineering + drift detection completed successfully.")
+    # ---- Inactivity / Sudden Drop / Declining Trend (+ plugged-in rules)
+    apply_drift_rules(df)
 
+    return df
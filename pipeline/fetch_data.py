@@ -1,173 +1,378 @@
 # pipeline/fetch_data.py
 
+import os
+import time
 import datetime as dt
-from sqlalchemy import text
+from concurrent.futures import ThreadPoolExecutor, wait
+from sqlalchemy import text, bindparam
 
-from database import get_engine
-from utils.aggregator import fetch_all_platform_stats
+from database import get_engine, RETENTION_DAYS
+from pipeline.bulk_writer import upsert_rows
+from pipeline.codeforces_sync import load_sync_states, save_sync_states
+from pipeline.scheduler import load_schedule, filter_due, record_results
+from pipeline.raw_archive import archive_payloads, archive_problem_index
+from pipeline.rollups import update_rollups
+from pipeline.partitions import PARTITIONED_TABLES, is_partitioned, maintain_partitions
+from utils.aggregator import fetch_many_platform_stats, supports
+from utils.http_client import (
+    set_rate_limits, set_deadline, get_breaker, get_metrics, reset_metrics
+)
+from utils.circuit_breaker import CallRejectedError
 
 
-def fetch_profiles_from_db(conn):
+# Platforms pulled by run_fetch (comma separated)
+FETCH_PLATFORMS = [
+    p.strip() for p in os.getenv("FETCH_PLATFORMS", "leetcode").split(",")
+    if p.strip()
+]
+
+# Max profiles fetched in parallel (1 = serial)
+FETCH_CONCURRENCY = int(os.getenv("FETCH_CONCURRENCY", "8"))
+
+# Wall-clock budget for the whole fetch stage (seconds)
+FETCH_BUDGET_SECONDS = float(os.getenv("FETCH_BUDGET_SECONDS", "600"))
+
+# Requests per second allowed per platform (0 = unlimited).
+# Codeforces documents a limit of 1 call every 2 seconds.
+PLATFORM_RATE_LIMITS = {
+    "leetcode": float(os.getenv("LEETCODE_RATE_LIMIT", "5")),
+    "codeforces": float(os.getenv("CODEFORCES_RATE_LIMIT", "0.5")),
+    "gfg": float(os.getenv("GFG_RATE_LIMIT", "2")),
+    "hackerrank": 0,
+}
+
+# Handles per fetch_many call for batch-capable platforms
+FETCH_BATCH_SIZE = int(os.getenv("FETCH_BATCH_SIZE", "50"))
+
+# Rows per multi-row INSERT ... ON CONFLICT statement
+UPSERT_BATCH_SIZE = 500
+
+
+def fetch_profiles_from_db(conn, platforms=None):
     """
     Fetch platform usernames from platform_profiles.
-    Currently supports only 'leetcode'.
+    Defaults to FETCH_PLATFORMS (only 'leetcode' unless configured).
     """
+    platforms = list(platforms or FETCH_PLATFORMS)
+
     rows = conn.execute(
         text("""
             SELECT username, platform, platform_username
             FROM platform_profiles
-            WHERE platform = 'leetcode'
-        """)
+            WHERE platform IN :platforms
+        """).bindparams(bindparam("platforms", expanding=True)),
+        {"platforms": platforms}
     ).mappings().all()
 
     return rows
 
 
-def run_fetch():
+def _build_tasks(profiles):
+    """
+    Group profiles into fetch tasks: batch-capable platforms get one task
+    per FETCH_BATCH_SIZE handles, everything else one task per profile.
+    """
+    by_platform = {}
+    for row in profiles:
+        by_platform.setdefault(row["platform"], []).append(row)
+
+    tasks = []
+    for platform, rows in by_platform.items():
+        size = FETCH_BATCH_SIZE if supports(platform, "batch") else 1
+        for i in range(0, len(rows), size):
+            tasks.append((platform, rows[i:i + size]))
+    return tasks
+
+
+def fetch_stats_concurrently(profiles, max_workers=None, rate_limits=None,
+                             sync_states=None, budget_seconds=None):
+    """
+    Fetch stats for every profile on a bounded thread pool.
+
+    Per-platform rate limits and circuit breakers are enforced by the
+    shared HTTP client on every request, so the pool size never
+    translates into more requests/sec than the upstream allows.
+    `sync_states` maps (platform, platform_username) → previous sync
+    state for incremental adapters.
+
+    Tasks for a platform whose breaker is open, and anything not finished
+    within `budget_seconds`, are skipped rather than waited on. Each task
+    runs with the stage deadline on its thread, so its requests time out
+    with the budget and none start after it; calls rejected that way or
+    by the breaker once a task is running are skipped too, so they don't
+    count as failures in the fetch schedule.
+    Returns (results, skipped): results is [(profile, stats)] in input
+    order with stats None on failure; skipped is the list of profiles
+    that were never attempted or didn't finish in time.
+    """
+    sync_states = sync_states or {}
+    max_workers = max(1, max_workers or FETCH_CONCURRENCY)
+    budget = FETCH_BUDGET_SECONDS if budget_seconds is None else budget_seconds
+    deadline = time.monotonic() + budget
+    set_rate_limits(PLATFORM_RATE_LIMITS if rate_limits is None else rate_limits)
+
+    def _fetch(task):
+        platform, rows = task
+        if time.monotonic() >= deadline or get_breaker(platform).is_open():
+            return None
+
+        handles = [r["platform_username"] for r in rows]
+        states = {
+            h: sync_states[(platform, h)]
+            for h in handles if (platform, h) in sync_states
+        }
+        set_deadline(deadline)
+        try:
+            return fetch_many_platform_stats(platform, handles, states)
+        except CallRejectedError:
+            return None
+        except Exception as e:
+            print(f"[fetch] Error for {platform} {handles[:3]}: {e}")
+            return {h: None for h in handles}
+        finally:
+            set_deadline(None)
+
+    tasks = _build_tasks(profiles)
+
+    if max_workers == 1:
+        outcomes = [_fetch(task) for task in tasks]
+    else:
+        pool = ThreadPoolExecutor(max_workers=max_workers)
+        futures = [pool.submit(_fetch, task) for task in tasks]
+        wait(futures, timeout=max(0.0, deadline - time.monotonic()))
+
+        # Don't wait on stragglers; they are reported as skipped
+        pool.shutdown(wait=False, cancel_futures=True)
+        outcomes = [
+            f.result() if f.done() and not f.cancelled() else None
+            for f in futures
+        ]
+
+    stats_by_key = {}
+    skipped = []
+    for (platform, rows), batch in zip(tasks, outcomes):
+        if batch is None:
+            skipped.extend(rows)
+            continue
+        for row in rows:
+            # left out of the batch: rejected (breaker / deadline) mid-task
+            if row["platform_username"] not in batch:
+                skipped.append(row)
+                continue
+            stats_by_key[(platform, row["platform_username"])] = batch[
+                row["platform_username"]
+            ]
+
+    results = [
+        (row, stats_by_key[(row["platform"], row["platform_username"])])
+        for row in profiles
+        if (row["platform"], row["platform_username"]) in stats_by_key
+    ]
+    return results, skipped
+
+
+def report_fetch_metrics(skipped):
+    for platform, m in sorted(get_metrics().items()):
+        print(
+            f"[fetch] {platform}: {m['requests']} requests, "
+            f"{m['errors']} errors, {m['cache_hits']} cache hits, "
+            f"avg {m['latency_avg'] * 1000:.0f}ms, "
+            f"max {m['latency_max'] * 1000:.0f}ms, breaker {m['breaker']}"
+        )
+
+    if skipped:
+        names = ", ".join(
+            f"{r['platform']}:{r['platform_username']}" for r in skipped[:10]
+        )
+        more = f" (+{len(skipped) - 10} more)" if len(skipped) > 10 else ""
+        print(
+            f"[fetch] Skipped {len(skipped)} profiles "
+            f"(breaker open / budget exhausted), retried next run: {names}{more}"
+        )
+
+
+def load_latest_weeks(conn, usernames, before=None):
+    """
+    One query for every user's latest (week, week_start_date),
+    optionally only among rows dated before `before`.
+    Returns {username: (week, week_start_date)}.
+    """
+    rows = conn.execute(
+        text("""
+            SELECT DISTINCT ON (username) username, week, week_start_date
+            FROM dsa_data
+            WHERE username = ANY(:users)
+              AND (CAST(:before AS DATE) IS NULL OR date < :before)
+            ORDER BY username, date DESC, id DESC
+        """),
+        {"users": list(usernames), "before": before}
+    ).mappings().all()
+
+    return {r["username"]: (r["week"], r["week_start_date"]) for r in rows}
+
+
+def next_week_for(last, today_date):
+    """
+    Week rollover: a new week starts once 7+ days have passed
+    since the current week's start date.
+    """
+    if not last:
+        return 1, today_date
+
+    last_week, week_start = last
+    if week_start is None:
+        return last_week, today_date
+
+    if (today_date - week_start).days >= 7:
+        return last_week + 1, today_date
+
+    return last_week, week_start
+
+
+def snapshot_record(username, week, week_start, day, stats):
+    return {
+        "username": username,
+        "week": week,
+        "week_start_date": week_start,
+        "date": day,
+        "easy_solved": stats["easy_solved"],
+        "medium_solved": stats["medium_solved"],
+        "hard_solved": stats["hard_solved"],
+        "total_solved": stats["total_solved"],
+    }
+
+
+def upsert_snapshots(conn, records):
+    """
+    Batched multi-row INSERT ... ON CONFLICT (username, date) DO UPDATE.
+    Relies on the uq_dsa_data_username_date index.
+    """
+    upsert_rows(
+        conn, "dsa_data", records, ["username", "date"],
+        batch_rows=UPSERT_BATCH_SIZE
+    )
+
+
+def run_fetch(max_workers=None, force_all=False):
+    """
+    Fetch every due profile (all of them with force_all=True) and
+    upsert today's snapshots.
+    """
     today_dt = dt.datetime.utcnow()
     today_date = today_dt.date()
     today = today_date.strftime("%Y-%m-%d")
 
-    # 🔴 retention window (30 days)
-    retention_cutoff = (today_date - dt.timedelta(days=30)).strftime("%Y-%m-%d")
+    # 🔴 retention window (RETENTION_DAYS, 30 by default)
+    retention_cutoff = (
+        today_date - dt.timedelta(days=RETENTION_DAYS)
+    ).strftime("%Y-%m-%d")
 
     engine = get_engine()
 
-    with engine.begin() as conn:
+    # =====================================================
+    # LOAD PLATFORM PROFILES
+    # =====================================================
+    with engine.connect() as conn:
+        all_profiles = fetch_profiles_from_db(conn)
 
-        # =====================================================
-        # 🔴 AUTO-CLEANUP (30 DAYS)
-        # =====================================================
-        deleted_data = conn.execute(
-            text("DELETE FROM dsa_data WHERE date < :cutoff"),
-            {"cutoff": retention_cutoff}
-        ).rowcount
+        schedule = load_schedule(conn, FETCH_PLATFORMS)
+        profiles = filter_due(all_profiles, schedule, today_dt, force_all)
+        print(f"[schedule] {len(profiles)} of {len(all_profiles)} profiles due")
 
-        deleted_features = conn.execute(
-            text("DELETE FROM dsa_features WHERE date < :cutoff"),
-            {"cutoff": retention_cutoff}
-        ).rowcount
+        cf_handles = [
+            r["platform_username"] for r in profiles if r["platform"] == "codeforces"
+        ]
+        sync_states = {
+            ("codeforces", handle): state
+            for handle, state in load_sync_states(conn, cf_handles).items()
+        }
 
-        print(
-            f"[cleanup] Removed {deleted_data} rows from dsa_data, "
-            f"{deleted_features} from dsa_features"
-        )
+    if not profiles:
+        print("[fetch] No platform profiles due.")
+        engine.dispose()
+        return
+
+    # =====================================================
+    # FETCH ALL STATS (network only, no open transaction)
+    # =====================================================
+    reset_metrics()
+    results, skipped = fetch_stats_concurrently(
+        profiles, max_workers=max_workers, sync_states=sync_states
+    )
+    report_fetch_metrics(skipped)
+
+    archived = archive_payloads(results, today)
+    print(f"[archive] Stored {archived} raw payloads")
+
+    # Replay classifies Codeforces payloads with the index used today
+    if any(row["platform"] == "codeforces" and stats for row, stats in results):
+        from utils.codeforces_api import load_problem_index
+        archive_problem_index(today, load_problem_index())
+
+    # =====================================================
+    # SHORT WRITE TRANSACTION
+    # =====================================================
+    with engine.begin() as conn:
 
         # =====================================================
-        # LOAD PLATFORM PROFILES
+        # 🔴 AUTO-CLEANUP (RETENTION WINDOW)
         # =====================================================
-        profiles = fetch_profiles_from_db(conn)
+        # Partitioned tables: drop whole expired partitions (metadata
+        # only) and create the upcoming ones. Otherwise DELETE old rows.
+        removed = {}
+        for table in PARTITIONED_TABLES:
+            if is_partitioned(conn, table):
+                created, dropped = maintain_partitions(
+                    conn, table, today_date, RETENTION_DAYS
+                )
+                removed[table] = f"{dropped} partitions (+{created} created)"
+            else:
+                deleted = conn.execute(
+                    text(f"DELETE FROM {table} WHERE date < :cutoff"),
+                    {"cutoff": retention_cutoff}
+                ).rowcount
+                removed[table] = f"{deleted} rows"
 
-        if not profiles:
-            print("[fetch] No platform profiles found.")
-            return
+        print(
+            f"[cleanup] Removed {removed['dsa_data']} from dsa_data, "
+            f"{removed['dsa_features']} from dsa_features"
+        )
 
         # =====================================================
-        # PROCESS EACH PROFILE
+        # BUILD TODAY'S SNAPSHOTS (week logic in memory)
         # =====================================================
-        for row in profiles:
-            platform = row["platform"]
+        snapshots = {}
+        cf_states = {}
+        for row, stats in results:
             platform_username = row["platform_username"]
 
-            # -------------------------------------------
-            # 1️⃣ Fetch stats
-            # -------------------------------------------
-            stats = fetch_all_platform_stats(platform, platform_username)
             if not stats:
                 print(f"[fetch] Failed for {platform_username}")
                 continue
 
-            # -------------------------------------------
-            # 2️⃣ Fetch LAST ROW (for week logic)
-            # -------------------------------------------
-            last_row = conn.execute(
-                text("""
-                    SELECT week, week_start_date
-                    FROM dsa_data
-                    WHERE username = :u
-                    ORDER BY id DESC
-                    LIMIT 1
-                """),
-                {"u": platform_username}
-            ).mappings().first()
-
-            if last_row:
-                last_week = last_row["week"]
-                week_start = last_row["week_start_date"]
-
-                days_since_week_start = (today_date - week_start).days
-
-                if days_since_week_start >= 7:
-                    next_week = last_week + 1
-                    new_week_start = today_date
-                else:
-                    next_week = last_week
-                    new_week_start = week_start
-            else:
-                next_week = 1
-                new_week_start = today_date
-
-            # -------------------------------------------
-            # 3️⃣ Check if TODAY already exists
-            # -------------------------------------------
-            today_row = conn.execute(
-                text("""
-                    SELECT id
-                    FROM dsa_data
-                    WHERE username = :u AND date = :d
-                """),
-                {"u": platform_username, "d": today}
-            ).mappings().first()
-
-            # -------------------------------------------
-            # 4️⃣ UPDATE if exists, else INSERT
-            # -------------------------------------------
-            if today_row:
-                conn.execute(
-                    text("""
-                        UPDATE dsa_data
-                        SET
-                            week = :w,
-                            week_start_date = :ws,
-                            easy_solved = :e,
-                            medium_solved = :m,
-                            hard_solved = :h,
-                            total_solved = :t
-                        WHERE id = :id
-                    """),
-                    {
-                        "w": next_week,
-                        "ws": new_week_start,
-                        "e": stats["easy_solved"],
-                        "m": stats["medium_solved"],
-                        "h": stats["hard_solved"],
-                        "t": stats["total_solved"],
-                        "id": today_row["id"],
-                    }
-                )
-                print(f"[fetch] Updated week {next_week} → {platform_username}")
+            snapshots[platform_username] = stats
+            if stats.get("sync_state") and row["platform"] == "codeforces":
+                cf_states[platform_username] = stats["sync_state"]
 
-            else:
-                conn.execute(
-                    text("""
-                        INSERT INTO dsa_data
-                        (username, week, week_start_date, date,
-                         easy_solved, medium_solved, hard_solved, total_solved)
-                        VALUES
-                        (:u, :w, :ws, :d, :e, :m, :h, :t)
-                    """),
-                    {
-                        "u": platform_username,
-                        "w": next_week,
-                        "ws": new_week_start,
-                        "d": today,
-                        "e": stats["easy_solved"],
-                        "m": stats["medium_solved"],
-                        "h": stats["hard_solved"],
-                        "t": stats["total_solved"],
-                    }
+        save_sync_states(conn, cf_states)
+        record_results(conn, results, schedule, today_dt)
+
+        if not snapshots:
+            print("[fetch] No stats fetched.")
+        else:
+            latest = load_latest_weeks(conn, list(snapshots))
+
+            records = []
+            for platform_username, stats in snapshots.items():
+                week, week_start = next_week_for(
+                    latest.get(platform_username), today_date
                 )
-                print(f"[fetch] Inserted week {next_week} → {platform_username}")
+                records.append(snapshot_record(
+                    platform_username, week, week_start, today, stats
+                ))
 
-    engine.dispose()
+            upsert_snapshots(conn, records)
+            update_rollups(conn, list(snapshots), today)
+            print(f"[fetch] Upserted {len(records)} snapshots for {today}")
 
+    engine.dispose()
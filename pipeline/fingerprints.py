@@ -0,0 +1,70 @@
+# pipeline/fingerprints.py
+"""
+Per-user fingerprints of the raw rows that feed the latest features:
+md5 over (date, easy, medium, hard, total) of the user's newest
+lookback + 1 dsa_data rows. An unchanged fingerprint means the
+incremental engineer would only rewrite identical feature rows, so the
+user can be skipped (as long as they still have feature rows).
+"""
+import datetime as dt
+
+from sqlalchemy import text
+
+from pipeline.bulk_writer import upsert_rows
+
+FINGERPRINT_SQL = """
+    WITH recent AS (
+        SELECT username, date,
+               easy_solved, medium_solved, hard_solved, total_solved,
+               ROW_NUMBER() OVER (PARTITION BY username ORDER BY date DESC) AS rn
+        FROM dsa_data
+        WHERE {shard_filter}
+    ),
+    fp AS (
+        SELECT username,
+               md5(string_agg(
+                   concat_ws(',', date, easy_solved, medium_solved,
+                             hard_solved, total_solved),
+                   ';' ORDER BY date
+               )) AS fingerprint
+        FROM recent
+        WHERE rn <= :lookback + 1
+        GROUP BY username
+    )
+    SELECT fp.username,
+           fp.fingerprint,
+           (ff.fingerprint = fp.fingerprint
+            AND EXISTS (
+                SELECT 1 FROM dsa_features f WHERE f.username = fp.username
+            )) AS unchanged
+    FROM fp
+    LEFT JOIN feature_fingerprints ff ON ff.username = fp.username
+"""
+
+
+def load_fingerprints(conn, shard_filter, params):
+    """
+    Current fingerprints of the shard's users, split into
+    (changed {username: fingerprint}, number of unchanged users).
+    """
+    rows = conn.execute(
+        text(FINGERPRINT_SQL.format(shard_filter=shard_filter)), params
+    ).all()
+
+    changed = {r.username: r.fingerprint for r in rows if not r.unchanged}
+    return changed, len(rows) - len(changed)
+
+
+def save_fingerprints(conn, fingerprints: dict):
+    if not fingerprints:
+        return
+
+    now = dt.datetime.utcnow()
+    upsert_rows(
+        conn, "feature_fingerprints",
+        [
+            {"username": u, "fingerprint": f, "updated_at": now}
+            for u, f in fingerprints.items()
+        ],
+        ["username"]
+    )
@@ -0,0 +1,162 @@
+# pipeline/model_registry.py
+"""
+Process-wide model registry.
+
+train() saves through save_model(), which writes model/model.pkl and a
+model/model.json sidecar ({"version", "trained_at", ...}) atomically.
+get_model() deserializes the artifact once per process and reloads it
+only when the sidecar version or the file's mtime / size changes, so
+predictions don't pay a joblib.load per call.
+
+Forests are also exported to model/forest.npz (see tree_export);
+get_predictor() serves from that export when it matches the current
+version, so the serving process never imports scikit-learn.
+"""
+import os
+import json
+import threading
+import datetime as dt
+
+import joblib
+
+from pipeline.tree_export import export_forest, load_forest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODEL_FILE = os.path.join(ROOT, "model", "model.pkl")
+MODEL_META_FILE = os.path.join(ROOT, "model", "model.json")
+TRAINING_LOG_FILE = os.path.join(ROOT, "model", "training_runs.jsonl")
+FOREST_FILE = os.path.join(ROOT, "model", "forest.npz")
+
+# Hyperparameters promoted by tune_model, used by train() for that engine
+TUNED_CONFIG_FILE = os.path.join(ROOT, "model", "tuned_config.json")
+
+_lock = threading.Lock()
+_cached = {"key": None, "model": None, "meta": None}
+_cached_forest = {"key": None, "forest": None, "meta": None}
+
+
+def _atomic_write(path, write):
+    tmp = f"{path}.{os.getpid()}.tmp"
+    write(tmp)
+    os.replace(tmp, path)
+
+
+def save_model(model, **meta) -> dict:
+    """
+    Persist `model` and its sidecar; returns the sidecar dict.
+    Extra keyword arguments are stored in the sidecar as-is.
+    """
+    os.makedirs(os.path.dirname(MODEL_FILE), exist_ok=True)
+
+    now = dt.datetime.utcnow()
+    meta = {
+        "version": now.strftime("%Y%m%d%H%M%S%f"),
+        "trained_at": now.isoformat(timespec="seconds"),
+        **meta,
+    }
+
+    _atomic_write(MODEL_FILE, lambda p: joblib.dump(model, p))
+    meta["model_bytes"] = os.path.getsize(MODEL_FILE)
+
+    # Flat NumPy export for sklearn-free serving (tree forests only)
+    if hasattr(model, "estimators_") and all(
+        hasattr(est, "tree_") for est in model.estimators_
+    ):
+        export_forest(model, FOREST_FILE, meta["version"])
+        meta["forest_bytes"] = os.path.getsize(FOREST_FILE)
+    elif os.path.exists(FOREST_FILE):
+        os.remove(FOREST_FILE)
+
+    def _dump_meta(path):
+        with open(path, "w") as f:
+            json.dump(meta, f, indent=2)
+
+    _atomic_write(MODEL_META_FILE, _dump_meta)
+    return meta
+
+
+def log_training_run(record: dict):
+    """Append one JSON line per training run."""
+    os.makedirs(os.path.dirname(TRAINING_LOG_FILE), exist_ok=True)
+    with open(TRAINING_LOG_FILE, "a") as f:
+        f.write(json.dumps(record) + "\n")
+
+
+def save_tuned_config(config: dict):
+    """{"engine", "params", "cv_mae", ...} of the promoted configuration."""
+    os.makedirs(os.path.dirname(TUNED_CONFIG_FILE), exist_ok=True)
+
+    def _dump(path):
+        with open(path, "w") as f:
+            json.dump(config, f, indent=2)
+
+    _atomic_write(TUNED_CONFIG_FILE, _dump)
+
+
+def load_tuned_config() -> dict:
+    try:
+        with open(TUNED_CONFIG_FILE) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def load_meta() -> dict:
+    try:
+        with open(MODEL_META_FILE) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _artifact_key():
+    st = os.stat(MODEL_FILE)
+    return (load_meta().get("version"), st.st_mtime_ns, st.st_size)
+
+
+def get_model():
+    """
+    (model, meta) for the current artifact, loaded at most once per
+    version. Raises FileNotFoundError if no model was trained yet.
+    """
+    if not os.path.exists(MODEL_FILE):
+        raise FileNotFoundError("Model missing. Run pipeline first.")
+
+    key = _artifact_key()
+
+    with _lock:
+        if _cached["key"] != key:
+            _cached["model"] = joblib.load(MODEL_FILE)
+            _cached["meta"] = load_meta()
+            _cached["key"] = key
+            print(f"[model] Loaded model version {key[0] or 'unversioned'}")
+
+        return _cached["model"], _cached["meta"]
+
+
+def get_predictor():
+    """
+    (predictor, meta): the memory-mapped forest export when it belongs
+    to the current model version, otherwise the unpickled model.
+    Both expose predict(X).
+    """
+    meta = load_meta()
+    version = meta.get("version")
+
+    if version and os.path.exists(FOREST_FILE):
+        st = os.stat(FOREST_FILE)
+        key = (version, st.st_mtime_ns, st.st_size)
+
+        with _lock:
+            if _cached_forest["key"] != key:
+                forest = load_forest(FOREST_FILE)
+                if forest.version != version:
+                    forest = None
+                _cached_forest.update(key=key, forest=forest, meta=meta)
+                if forest is not None:
+                    print(f"[model] Mapped forest export version {version}")
+
+            if _cached_forest["forest"] is not None:
+                return _cached_forest["forest"], _cached_forest["meta"]
+
+    return get_model()
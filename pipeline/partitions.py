@@ -0,0 +1,134 @@
+# pipeline/partitions.py
+"""
+Daily range partitions for dsa_data / dsa_features (DSA_PARTITIONED=1).
+
+Partitions are named <table>_pYYYYMMDD. Retention becomes dropping
+whole partitions instead of DELETE + vacuum, and date-bounded queries
+only scan the partitions they need.
+
+Daily partitions cover the retention window and a week ahead; a DEFAULT
+partition (<table>_default) takes any other date (replays, backfills of
+older history) so inserts never fail for lack of a partition.
+"""
+import datetime as dt
+from sqlalchemy import text
+
+PARTITIONED_TABLES = ("dsa_data", "dsa_features")
+
+# Partitions created ahead of today so inserts never miss one
+PARTITION_AHEAD_DAYS = 7
+
+
+def partition_name(table: str, day: dt.date) -> str:
+    return f"{table}_p{day:%Y%m%d}"
+
+
+def is_partitioned(conn, table: str) -> bool:
+    return bool(conn.execute(
+        text("""
+            SELECT EXISTS (
+                SELECT 1
+                FROM pg_partitioned_table p
+                JOIN pg_class c ON c.oid = p.partrelid
+                WHERE c.relname = :t
+            )
+        """),
+        {"t": table}
+    ).scalar())
+
+
+def default_partition(table: str) -> str:
+    return f"{table}_default"
+
+
+def ensure_default_partition(conn, table: str):
+    conn.exec_driver_sql(
+        f"CREATE TABLE IF NOT EXISTS {default_partition(table)} "
+        f"PARTITION OF {table} DEFAULT"
+    )
+
+
+def list_partitions(conn, table: str) -> dict:
+    """
+    {day: partition name} for partitions following our naming scheme.
+    """
+    names = conn.execute(
+        text("""
+            SELECT c.relname
+            FROM pg_inherits i
+            JOIN pg_class c ON c.oid = i.inhrelid
+            JOIN pg_class parent ON parent.oid = i.inhparent
+            WHERE parent.relname = :t
+        """),
+        {"t": table}
+    ).scalars().all()
+
+    prefix = f"{table}_p"
+    days = {}
+    for name in names:
+        suffix = name[len(prefix):]
+        if name.startswith(prefix) and suffix.isdigit() and len(suffix) == 8:
+            days[dt.datetime.strptime(suffix, "%Y%m%d").date()] = name
+    return days
+
+
+def ensure_partitions(conn, table: str, first_day: dt.date, last_day: dt.date) -> int:
+    """
+    Create any missing daily partition in [first_day, last_day].
+    Days that already have rows in the DEFAULT partition are left there
+    (Postgres refuses a partition whose range the default still holds).
+    """
+    ensure_default_partition(conn, table)
+    existing = list_partitions(conn, table)
+    in_default = set(conn.execute(
+        text(f"""
+            SELECT DISTINCT date FROM {default_partition(table)}
+            WHERE date BETWEEN :first AND :last
+        """),
+        {"first": first_day, "last": last_day}
+    ).scalars().all())
+    created = 0
+
+    day = first_day
+    while day <= last_day:
+        if day not in existing and day not in in_default:
+            conn.exec_driver_sql(
+                f"CREATE TABLE IF NOT EXISTS {partition_name(table, day)} "
+                f"PARTITION OF {table} "
+                f"FOR VALUES FROM ('{day}') TO ('{day + dt.timedelta(days=1)}')"
+            )
+            created += 1
+        day += dt.timedelta(days=1)
+
+    return created
+
+
+def drop_expired_partitions(conn, table: str, cutoff: dt.date) -> int:
+    """
+    Drop partitions whose whole day range is before `cutoff`, and delete
+    expired rows from the DEFAULT partition.
+    """
+    dropped = 0
+    for day, name in sorted(list_partitions(conn, table).items()):
+        if day < cutoff:
+            conn.exec_driver_sql(f"DROP TABLE IF EXISTS {name}")
+            dropped += 1
+
+    conn.execute(
+        text(f"DELETE FROM {default_partition(table)} WHERE date < :cutoff"),
+        {"cutoff": cutoff}
+    )
+    return dropped
+
+
+def maintain_partitions(conn, table: str, today: dt.date, retention_days: int):
+    """
+    Create upcoming partitions and drop expired ones.
+    Returns (created, dropped).
+    """
+    cutoff = today - dt.timedelta(days=retention_days)
+    created = ensure_partitions(
+        conn, table, cutoff, today + dt.timedelta(days=PARTITION_AHEAD_DAYS)
+    )
+    dropped = drop_expired_partitions(conn, table, cutoff)
+    return created, dropped
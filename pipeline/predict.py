@@ -1,51 +1,74 @@
 # pipeline/predict.py
-import os
+import datetime as dt
+
 import pandas as pd
-import joblib
 from sqlalchemy import text
 
-from database import get_engine
+from database import get_engine, get_shared_engine
+from .bulk_writer import write_frame
 from .train_model import FEATURE_COLS
+from .schema import read_table, apply_schema
+from .model_registry import get_model, get_predictor
 
-ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-MODEL_FILE = os.path.join(ROOT, "model", "model.pkl")
+# Every user's latest feature row
+LATEST_FEATURES_SQL = f"""
+    SELECT DISTINCT ON (username) username, date, {", ".join(FEATURE_COLS)}
+    FROM dsa_features
+    ORDER BY username, date DESC
+"""
 
 
 def predict_for_username(username: str) -> float:
-    engine = get_engine()
-
-    # Load the feature rows for this user
+    # Only the user's latest feature row
     try:
-        df = pd.read_sql(
-            text("SELECT * FROM dsa_features WHERE username = :u ORDER BY week"),
-            engine,
-            params={"u": username}
+        df = read_table(
+            get_shared_engine(), "dsa_features",
+            cols=FEATURE_COLS,
+            where="username = :u",
+            params={"u": username},
+            order_by="date DESC",
+            limit=1
         )
     except Exception as e:
-        engine.dispose()
         raise ValueError(f"Error reading features for {username}: {e}")
 
     if df.empty:
-        engine.dispose()
         raise ValueError(f"No data for user: {username}")
 
-    # Ensure model exists
-    if not os.path.exists(MODEL_FILE):
-        engine.dispose()
-        raise FileNotFoundError("Model missing. Run pipeline first.")
+    # Loaded once per process, reloaded when a new model is trained;
+    # a forest is served from its NumPy export (no scikit-learn import)
+    model, _ = get_predictor()
 
-    # Select the most recent row
-    last = df.iloc[-1]
+    X = df[FEATURE_COLS].fillna(0)
+    return float(model.predict(X)[0])
 
-    # Build input vector
-    X = last[FEATURE_COLS].values.reshape(1, -1)
 
-    # Load model
-    model = joblib.load(MODEL_FILE)
+def predict_all():
+    """
+    Score every user's latest feature row with one model.predict call
+    and replace the predictions table.
+    """
+    engine = get_engine()
 
-    # Dispose DB engine (avoid connection errors)
-    engine.dispose()
+    latest = apply_schema(
+        pd.read_sql(text(LATEST_FEATURES_SQL), engine), "dsa_features"
+    )
+    if latest.empty:
+        print("[predict] No feature rows found.")
+        engine.dispose()
+        return
 
-    # Return prediction
-    return float(model.predict(X)[0])
+    # Batch scoring stays on the sklearn model (compiled traversal)
+    model, meta = get_model()
+
+    out = pd.DataFrame({
+        "username": latest["username"].astype(str),
+        "feature_date": latest["date"],
+        "predicted_growth": model.predict(latest[FEATURE_COLS].fillna(0)),
+        "model_version": meta.get("version"),
+        "predicted_at": dt.datetime.utcnow(),
+    })
 
+    write_frame(engine, out, "predictions", "DELETE FROM predictions")
+    engine.dispose()
+    print(f"[predict] Stored {len(out)} predictions (model {meta.get('version')})")
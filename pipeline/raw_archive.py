@@ -0,0 +1,134 @@
+# pipeline/raw_archive.py
+"""
+Append-only archive of raw platform payloads, written during fetch so
+dsa_data can be rebuilt (pipeline/replay.py) without hitting the APIs.
+
+Layout (gzip-compressed JSON lines, one new segment per run):
+
+    data/raw_archive/date=YYYY-MM-DD/platform=<name>/part-<HHMMSS>-<pid>.jsonl.gz
+    data/raw_archive/date=YYYY-MM-DD/codeforces_problems.json.gz
+
+The second file is the Codeforces problem index (difficulty bucket per
+problem) in use that day, so replay never calls problemset.problems.
+"""
+import os
+import glob
+import gzip
+import json
+import datetime as dt
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ARCHIVE_DIR = os.getenv("RAW_ARCHIVE_DIR", os.path.join(ROOT, "data", "raw_archive"))
+ARCHIVE_ENABLED = os.getenv("RAW_ARCHIVE_ENABLED", "1") == "1"
+
+PROBLEM_INDEX_FILE = "codeforces_problems.json.gz"
+
+
+def _partition_dir(day: str, platform: str) -> str:
+    return os.path.join(ARCHIVE_DIR, f"date={day}", f"platform={platform}")
+
+
+def archive_payloads(results, day: str) -> int:
+    """
+    Write the "raw" payload of every successful fetch to a new segment
+    per platform, and drop it from the stats dicts afterwards.
+    Returns the number of records archived.
+    """
+    fetched_at = dt.datetime.utcnow().isoformat(timespec="seconds")
+    by_platform = {}
+
+    for row, stats in results:
+        if not stats or "raw" not in stats:
+            continue
+        raw = stats.pop("raw")
+        if not ARCHIVE_ENABLED:
+            continue
+        by_platform.setdefault(row["platform"], []).append({
+            "handle": row["platform_username"],
+            "fetched_at": fetched_at,
+            "payload": raw,
+        })
+
+    stamp = dt.datetime.utcnow().strftime("%H%M%S%f")
+    written = 0
+
+    for platform, records in by_platform.items():
+        folder = _partition_dir(day, platform)
+        os.makedirs(folder, exist_ok=True)
+
+        path = os.path.join(folder, f"part-{stamp}-{os.getpid()}.jsonl.gz")
+        tmp = path + ".tmp"
+        with gzip.open(tmp, "wt", encoding="utf-8") as f:
+            for record in records:
+                f.write(json.dumps(record, separators=(",", ":")) + "\n")
+        os.replace(tmp, path)
+        written += len(records)
+
+    return written
+
+
+def archive_problem_index(day: str, index: dict) -> bool:
+    """
+    Store the day's Codeforces problem index ({(contestId, index): bucket})
+    once per day. Returns True if a file was written.
+    """
+    path = os.path.join(ARCHIVE_DIR, f"date={day}", PROBLEM_INDEX_FILE)
+    if not ARCHIVE_ENABLED or not index or os.path.exists(path):
+        return False
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + ".tmp"
+    with gzip.open(tmp, "wt", encoding="utf-8") as f:
+        json.dump(
+            [[contest, index_, bucket] for (contest, index_), bucket in index.items()],
+            f, separators=(",", ":")
+        )
+    os.replace(tmp, path)
+    return True
+
+
+def load_archived_problem_index(day: str) -> dict:
+    """
+    The newest archived Codeforces problem index on or before `day`.
+    Raises FileNotFoundError if there is none.
+    """
+    paths = sorted(
+        p for p in glob.glob(os.path.join(ARCHIVE_DIR, "date=*", PROBLEM_INDEX_FILE))
+        if os.path.basename(os.path.dirname(p)).split("=", 1)[1] <= day
+    )
+    if not paths:
+        raise FileNotFoundError(
+            f"No archived Codeforces problem index on or before {day}"
+        )
+
+    with gzip.open(paths[-1], "rt", encoding="utf-8") as f:
+        return {(contest, index): bucket for contest, index, bucket in json.load(f)}
+
+
+def archive_days(start: str = None, end: str = None) -> list:
+    """
+    Archived dates (YYYY-MM-DD), oldest first, within [start, end].
+    """
+    days = sorted(
+        os.path.basename(p).split("=", 1)[1]
+        for p in glob.glob(os.path.join(ARCHIVE_DIR, "date=*"))
+    )
+    return [
+        d for d in days
+        if (start is None or d >= start) and (end is None or d <= end)
+    ]
+
+
+def iter_day(day: str, platforms=None):
+    """
+    Yield (platform, record) for one day in write order.
+    """
+    for folder in sorted(glob.glob(os.path.join(ARCHIVE_DIR, f"date={day}", "platform=*"))):
+        platform = os.path.basename(folder).split("=", 1)[1]
+        if platforms and platform not in platforms:
+            continue
+
+        for path in sorted(glob.glob(os.path.join(folder, "part-*.jsonl.gz"))):
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                for line in f:
+                    yield platform, json.loads(line)
@@ -0,0 +1,152 @@
+# pipeline/rollups.py
+"""
+Weekly / monthly rollups of dsa_data: one row per user per period
+holding the period's last snapshot.
+
+dsa_weekly is keyed by (username, week_start_date), dsa_monthly by
+(username, month_start). run_fetch refreshes the current period of
+every user it wrote; rebuild_rollups() recomputes everything still in
+dsa_data. Rollup rows outlive the dsa_data retention window.
+
+The backfill runs when the tables are first created, after a replay,
+or on demand:
+
+    python -m pipeline.rollups --rebuild
+"""
+import argparse
+
+import pandas as pd
+from sqlalchemy import text
+
+ROLLUP_UPSERT_SQL = """
+    INSERT INTO {table}
+        (username, {key}, week, last_date,
+         easy_solved, medium_solved, hard_solved, total_solved, days_reported)
+    SELECT DISTINCT ON (d.username, {period})
+           d.username, {period}, d.week, d.date,
+           d.easy_solved, d.medium_solved, d.hard_solved, d.total_solved,
+           COUNT(*) OVER (PARTITION BY d.username, {period})
+    FROM dsa_data d
+    WHERE {period} IS NOT NULL
+      AND {scope}
+    ORDER BY d.username, {period}, d.date DESC
+    ON CONFLICT (username, {key}) DO UPDATE SET
+        week = EXCLUDED.week,
+        last_date = EXCLUDED.last_date,
+        easy_solved = EXCLUDED.easy_solved,
+        medium_solved = EXCLUDED.medium_solved,
+        hard_solved = EXCLUDED.hard_solved,
+        total_solved = EXCLUDED.total_solved,
+        days_reported = EXCLUDED.days_reported
+"""
+
+ROLLUPS = {
+    "weekly": {
+        "table": "dsa_weekly",
+        "key": "week_start_date",
+        "period": "d.week_start_date",
+        # a user's current week started within the last 7 days
+        "scope": "d.username = ANY(:users) AND d.week_start_date > CAST(:day AS DATE) - 7",
+    },
+    "monthly": {
+        "table": "dsa_monthly",
+        "key": "month_start",
+        "period": "CAST(date_trunc('month', d.date) AS DATE)",
+        "scope": "d.username = ANY(:users) "
+                 "AND d.date >= CAST(date_trunc('month', CAST(:day AS DATE)) AS DATE)",
+    },
+}
+
+
+def create_rollup_tables(conn) -> bool:
+    """
+    Create missing rollup tables. Returns True if any was created
+    (i.e. it needs a backfill).
+    """
+    created = False
+    for rollup in ROLLUPS.values():
+        if conn.execute(
+            text("SELECT to_regclass(:t) IS NOT NULL"), {"t": rollup["table"]}
+        ).scalar():
+            continue
+
+        created = True
+        conn.exec_driver_sql(f"""
+            CREATE TABLE IF NOT EXISTS {rollup["table"]} (
+                username VARCHAR(100) NOT NULL,
+                {rollup["key"]} DATE NOT NULL,
+                week INT,
+                last_date DATE,
+                easy_solved INT,
+                medium_solved INT,
+                hard_solved INT,
+                total_solved INT,
+                days_reported INT,
+                PRIMARY KEY (username, {rollup["key"]})
+            );
+        """)
+    return created
+
+
+def update_rollups(conn, usernames, day):
+    """
+    Refresh the current week / month of `usernames` after their
+    snapshots for `day` were upserted (same transaction).
+    """
+    if not usernames:
+        return
+
+    for rollup in ROLLUPS.values():
+        conn.execute(
+            text(ROLLUP_UPSERT_SQL.format(**rollup)),
+            {"users": list(usernames), "day": day}
+        )
+
+
+def rebuild_rollups(conn):
+    """Recompute every period still present in dsa_data."""
+    for rollup in ROLLUPS.values():
+        conn.execute(text(ROLLUP_UPSERT_SQL.format(**{**rollup, "scope": "TRUE"})))
+
+
+def load_rollup(engine, kind="weekly", username=None):
+    """
+    Rollup rows ordered by (username, period), plus the period's growth
+    (total_solved minus the previous period's; the first period counts
+    from 0 like the lag features).
+    """
+    rollup = ROLLUPS[kind]
+    key = rollup["key"]
+
+    df = pd.read_sql(
+        text(f"""
+            SELECT *
+            FROM {rollup["table"]}
+            WHERE CAST(:username AS TEXT) IS NULL OR username = :username
+            ORDER BY username, {key}
+        """),
+        engine,
+        params={"username": username}
+    )
+
+    growth_col = "weekly_growth" if kind == "weekly" else "monthly_growth"
+    prev = df.groupby("username")["total_solved"].shift(1).fillna(0)
+    df[growth_col] = df["total_solved"] - prev
+    return df
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Weekly / monthly rollups")
+    parser.add_argument("--rebuild", action="store_true",
+                        help="recompute every period still in dsa_data")
+    args = parser.parse_args()
+
+    if args.rebuild:
+        from database import get_engine
+
+        engine = get_engine()
+        with engine.begin() as conn:
+            create_rollup_tables(conn)
+            rebuild_rollups(conn)
+        engine.dispose()
+        print("[rollups] Rebuilt dsa_weekly and dsa_monthly")
@@ -1,14 +1,33 @@
 # pipeline/run_pipeline.py
+import os
+
 from .fetch_data import run_fetch
 from .feature_engineering import engineer
+from .sql_features import engineer_sql
 from .train_model import train
+from .predict import predict_all
+from .tune_model import tune
+
+# Run the hyperparameter search after training (slow; off by default)
+TUNE_MODEL = os.getenv("TUNE_MODEL", "0") == "1"
+
+# Feature engine: "pandas" (default) or "sql" (computed in the database)
+FE_ENGINE = os.getenv("FE_ENGINE", "pandas")
 
 
-def run_full_pipeline():
+def run_full_pipeline(force_fetch=False):
     print(">>> Fetching from LeetCode & saving to dsa_data...")
-    run_fetch()
+    run_fetch(force_all=force_fetch)
     print(">>> Engineering features into dsa_features...")
-    engineer()
+    if FE_ENGINE == "sql":
+        engineer_sql()
+    else:
+        engineer()
     print(">>> Training ML model...")
     train()
+    if TUNE_MODEL:
+        print(">>> Tuning hyperparameters...")
+        tune()
+    print(">>> Scoring every user...")
+    predict_all()
     print(">>> Pipeline Done.")
@@ -0,0 +1,105 @@
+# pipeline/scheduler.py
+"""
+Fetch scheduler: every profile gets a next-due time from its recent
+activity, last fetch time and failure history, so run_fetch only calls
+the APIs for profiles that are actually due.
+"""
+import os
+import datetime as dt
+from sqlalchemy import text
+
+from pipeline.bulk_writer import upsert_rows
+
+# Never re-fetch a profile sooner than this
+MIN_INTERVAL = dt.timedelta(hours=float(os.getenv("FETCH_MIN_INTERVAL_HOURS", "6")))
+
+# Active users: roughly daily (a bit under 24h so a daily run always catches them)
+ACTIVE_INTERVAL = dt.timedelta(hours=20)
+
+# Idle users: interval doubles per idle week, capped here
+MAX_IDLE_INTERVAL = dt.timedelta(days=7)
+
+# Failures: exponential backoff 1h, 2h, 4h ... capped at a day
+FAILURE_BACKOFF = dt.timedelta(hours=1)
+MAX_FAILURE_BACKOFF = dt.timedelta(days=1)
+
+
+def next_due_at(now, last_changed_at, consecutive_failures):
+    if consecutive_failures:
+        backoff = FAILURE_BACKOFF * 2 ** min(consecutive_failures - 1, 10)
+        return now + min(backoff, MAX_FAILURE_BACKOFF)
+
+    idle_weeks = (now - last_changed_at).days // 7 if last_changed_at else 0
+    interval = min(ACTIVE_INTERVAL * 2 ** min(idle_weeks, 10), MAX_IDLE_INTERVAL)
+
+    return now + max(interval, MIN_INTERVAL)
+
+
+def load_schedule(conn, platforms):
+    """
+    {(platform, platform_username): schedule row} for the given platforms.
+    """
+    rows = conn.execute(
+        text("""
+            SELECT platform, platform_username, last_fetched_at,
+                   last_changed_at, last_total, consecutive_failures,
+                   next_due_at
+            FROM fetch_schedule
+            WHERE platform = ANY(:platforms)
+        """),
+        {"platforms": list(platforms)}
+    ).mappings().all()
+
+    return {(r["platform"], r["platform_username"]): dict(r) for r in rows}
+
+
+def filter_due(profiles, schedule, now, force_all=False):
+    """
+    Profiles whose next_due_at has passed (or that were never fetched).
+    """
+    if force_all:
+        return list(profiles)
+
+    due = []
+    for row in profiles:
+        entry = schedule.get((row["platform"], row["platform_username"]))
+        if not entry or not entry["next_due_at"] or entry["next_due_at"] <= now:
+            due.append(row)
+    return due
+
+
+def record_results(conn, results, schedule, now):
+    """
+    Update fetch_schedule for every attempted profile in one batch.
+    """
+    records = []
+
+    for row, stats in results:
+        key = (row["platform"], row["platform_username"])
+        prev = schedule.get(key) or {}
+
+        if stats:
+            total = stats.get("total_solved")
+            changed = not prev or prev.get("last_total") != total
+            last_changed = now if changed else prev.get("last_changed_at")
+            failures = 0
+            last_fetched = now
+        else:
+            total = prev.get("last_total")
+            last_changed = prev.get("last_changed_at")
+            failures = (prev.get("consecutive_failures") or 0) + 1
+            last_fetched = prev.get("last_fetched_at")
+
+        records.append({
+            "platform": key[0],
+            "platform_username": key[1],
+            "last_fetched_at": last_fetched,
+            "last_changed_at": last_changed,
+            "last_total": total,
+            "consecutive_failures": failures,
+            "next_due_at": next_due_at(now, last_changed, failures),
+        })
+
+    upsert_rows(
+        conn, "fetch_schedule", records, ["platform", "platform_username"]
+    )
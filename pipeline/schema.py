@@ -0,0 +1,131 @@
+# pipeline/schema.py
+"""
+Column schema for dsa_data / dsa_features as loaded into pandas.
+
+Only the listed columns are selected (no id), usernames and drift
+reasons are categoricals, counts int32 and ratios float32. Every stage
+loads through read_table() / apply_schema() so they share one set of
+dtypes.
+
+    python -m pipeline.schema     # memory report for both tables
+"""
+import pandas as pd
+from sqlalchemy import text
+
+SCHEMAS = {
+    "dsa_data": {
+        "username": "category",
+        "week": "int32",
+        "date": "datetime64[ns]",
+        "week_start_date": "datetime64[ns]",
+        "easy_solved": "int32",
+        "medium_solved": "int32",
+        "hard_solved": "int32",
+        "total_solved": "int32",
+    },
+    "dsa_features": {
+        "username": "category",
+        "week": "int32",
+        "date": "datetime64[ns]",
+        "week_start_date": "datetime64[ns]",
+        "total_solved": "int32",
+        "easy_solved": "int32",
+        "medium_solved": "int32",
+        "hard_solved": "int32",
+        "prev_total": "int32",
+        "prev_easy": "int32",
+        "prev_medium": "int32",
+        "prev_hard": "int32",
+        "weekly_growth": "int32",
+        "weekly_easy_growth": "int32",
+        "weekly_medium_growth": "int32",
+        "weekly_hard_growth": "int32",
+        "easy_ratio": "float32",
+        "medium_ratio": "float32",
+        "hard_ratio": "float32",
+        "balance_score": "float32",
+        "consistency_score": "float32",
+        "hard_problem_density": "float32",
+        "rolling_growth_3week": "float32",
+        "prev_weekly_growth": "int32",
+        "inactive_weeks": "int32",
+        "sudden_drop": "bool",
+        "declining_trend": "bool",
+        "drift_flag": "bool",
+        "drift_reason": "category",
+    },
+}
+
+
+def columns(table) -> list:
+    return list(SCHEMAS[table])
+
+
+def apply_schema(df, table):
+    """
+    Cast the schema's columns present in df. Nullable flags become
+    False; int columns that contain NULLs fall back to float32.
+    """
+    for col, dtype in SCHEMAS[table].items():
+        if col not in df:
+            continue
+
+        if dtype == "bool":
+            df[col] = df[col].fillna(False).astype(bool)
+        elif dtype == "int32" and df[col].isna().any():
+            df[col] = df[col].astype("float32")
+        else:
+            df[col] = df[col].astype(dtype)
+    return df
+
+
+def read_table(con, table, cols=None, where=None, params=None,
+               order_by="username, date", limit=None):
+    """
+    SELECT the schema columns (or `cols`) of `table` with compact dtypes.
+    """
+    cols = cols or columns(table)
+    sql = f"SELECT {', '.join(cols)} FROM {table}"
+    if where:
+        sql += f" WHERE {where}"
+    if order_by:
+        sql += f" ORDER BY {order_by}"
+    if limit:
+        sql += f" LIMIT {int(limit)}"
+
+    df = pd.read_sql(text(sql), con, params=params)
+    return apply_schema(df, table)
+
+
+def memory_report(df, label=""):
+    """
+    Print df's memory next to the same frame with pandas' default
+    dtypes (object strings, int64 / float64).
+    """
+    compact = df.memory_usage(deep=True).sum()
+
+    defaults = {}
+    for col, dtype in df.dtypes.items():
+        if isinstance(dtype, pd.CategoricalDtype):
+            defaults[col] = object
+        elif pd.api.types.is_integer_dtype(dtype):
+            defaults[col] = "int64"
+        elif pd.api.types.is_float_dtype(dtype):
+            defaults[col] = "float64"
+    wide = df.astype(defaults).memory_usage(deep=True).sum()
+
+    saved = 1 - compact / wide if wide else 0.0
+    print(
+        f"[schema] {label}: {len(df)} rows, {compact / 1e6:.1f} MB "
+        f"(default dtypes {wide / 1e6:.1f} MB, -{saved:.0%})"
+    )
+    return compact, wide
+
+
+if __name__ == "__main__":
+    from database import get_engine
+
+    engine = get_engine()
+    for table in SCHEMAS:
+        memory_report(read_table(engine, table), table)
+    engine.dispose()
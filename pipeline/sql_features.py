@@ -0,0 +1,150 @@
+# pipeline/sql_features.py
+"""
+SQL-pushdown feature engine: the same features as
+feature_engineering.compute_features(), computed inside the database
+with window functions, so no rows are pulled into pandas.
+
+Covers the built-in drift rules (inactivity, sudden_drop,
+declining_trend). Rules plugged into drift_rules only run in the
+pandas engine.
+
+The SELECT sticks to window functions both PostgreSQL and SQLite
+understand (SQLite needs a sqrt() function registered when it was built
+without math functions); see benchmarks/bench_sql_features.py for the
+parity check against the pandas engine.
+"""
+from database import get_engine, ensure_feature_columns
+from pipeline.drift_rules import DRIFT_RULES
+
+FEATURE_COLUMNS = [
+    "username", "week", "date", "week_start_date",
+    "total_solved", "easy_solved", "medium_solved", "hard_solved",
+    "prev_total", "prev_easy", "prev_medium", "prev_hard",
+    "weekly_growth", "weekly_easy_growth",
+    "weekly_medium_growth", "weekly_hard_growth",
+    "easy_ratio", "medium_ratio", "hard_ratio", "balance_score",
+    "consistency_score", "hard_problem_density", "rolling_growth_3week",
+    "prev_weekly_growth", "inactive_weeks",
+    "sudden_drop", "declining_trend", "drift_flag", "drift_reason",
+]
+
+
+def _reason(name):
+    return next(r["reason"] for r in DRIFT_RULES if r["name"] == name)
+
+
+def features_select_sql(source="dsa_data") -> str:
+    """
+    SELECT producing one dsa_features row per `source` row.
+
+    - lags: LAG() per user, 0 for the first row (pandas fillna(0))
+    - rolling 3: sums over ROWS 2 PRECEDING, only once 3 rows exist;
+      sample std = sqrt((3*sum(x^2) - sum(x)^2) / 6), exact in integers
+    - inactivity: gaps and islands; every non-zero growth row opens a
+      new island and the streak is the island's running count of zeros
+    """
+    return f"""
+    WITH base AS (
+        SELECT username, week, date,
+               COALESCE(total_solved, 0) AS total_solved,
+               COALESCE(easy_solved, 0) AS easy_solved,
+               COALESCE(medium_solved, 0) AS medium_solved,
+               COALESCE(hard_solved, 0) AS hard_solved
+        FROM {source}
+    ),
+    lagged AS (
+        SELECT b.*,
+               COALESCE(LAG(total_solved) OVER u, 0) AS prev_total,
+               COALESCE(LAG(easy_solved) OVER u, 0) AS prev_easy,
+               COALESCE(LAG(medium_solved) OVER u, 0) AS prev_medium,
+               COALESCE(LAG(hard_solved) OVER u, 0) AS prev_hard,
+               CASE WHEN total_solved = 0 THEN 1 ELSE total_solved END AS denom
+        FROM base b
+        WINDOW u AS (PARTITION BY username ORDER BY date)
+    ),
+    growth AS (
+        SELECT l.*,
+               total_solved - prev_total AS weekly_growth,
+               easy_solved - prev_easy AS weekly_easy_growth,
+               medium_solved - prev_medium AS weekly_medium_growth,
+               hard_solved - prev_hard AS weekly_hard_growth
+        FROM lagged l
+    ),
+    rolled AS (
+        SELECT g.*,
+               COUNT(*) OVER r3 AS n3,
+               SUM(weekly_growth) OVER r3 AS s1,
+               SUM(weekly_growth * weekly_growth) OVER r3 AS s2,
+               LAG(weekly_growth) OVER u AS prev_weekly_growth,
+               LAG(weekly_growth, 2) OVER u AS prev2_weekly_growth,
+               SUM(CASE WHEN weekly_growth <> 0 THEN 1 ELSE 0 END)
+                   OVER (u ROWS UNBOUNDED PRECEDING) AS island
+        FROM growth g
+        WINDOW u AS (PARTITION BY username ORDER BY date),
+               r3 AS (PARTITION BY username ORDER BY date ROWS 2 PRECEDING)
+    ),
+    scored AS (
+        SELECT r.*,
+               CASE WHEN n3 = 3 THEN sqrt((3 * s2 - s1 * s1) / 6.0) ELSE 0 END
+                   AS consistency_score,
+               CASE WHEN n3 = 3 THEN s1 / 3.0 ELSE 0 END AS rolling_growth_3week,
+               SUM(CASE WHEN weekly_growth = 0 THEN 1 ELSE 0 END) OVER (
+                   PARTITION BY username, island ORDER BY date
+                   ROWS UNBOUNDED PRECEDING
+               ) AS inactive_weeks
+        FROM rolled r
+    ),
+    flagged AS (
+        SELECT s.*,
+               (weekly_growth < 0
+                AND abs(weekly_growth) > 0.5 * rolling_growth_3week) AS sudden_drop,
+               COALESCE(weekly_growth < prev_weekly_growth
+                        AND prev_weekly_growth < prev2_weekly_growth, FALSE)
+                   AS declining_trend
+        FROM scored s
+    )
+    SELECT username, week, date, date AS week_start_date,
+           total_solved, easy_solved, medium_solved, hard_solved,
+           prev_total, prev_easy, prev_medium, prev_hard,
+           weekly_growth, weekly_easy_growth,
+           weekly_medium_growth, weekly_hard_growth,
+           CAST(easy_solved AS DOUBLE PRECISION) / denom AS easy_ratio,
+           CAST(medium_solved AS DOUBLE PRECISION) / denom AS medium_ratio,
+           CAST(hard_solved AS DOUBLE PRECISION) / denom AS hard_ratio,
+           CAST(easy_solved + medium_solved + hard_solved AS DOUBLE PRECISION)
+               / denom AS balance_score,
+           consistency_score,
+           CAST(hard_solved AS DOUBLE PRECISION) / denom AS hard_problem_density,
+           rolling_growth_3week,
+           prev_weekly_growth,
+           inactive_weeks,
+           sudden_drop,
+           declining_trend,
+           (inactive_weeks >= 2 OR sudden_drop OR declining_trend) AS drift_flag,
+           CASE
+               WHEN declining_trend THEN '{_reason("declining_trend")}'
+               WHEN sudden_drop THEN '{_reason("sudden_drop")}'
+               WHEN inactive_weeks >= 2 THEN '{_reason("inactivity")}'
+           END AS drift_reason
+    FROM flagged
+    """
+
+
+def engineer_sql():
+    """
+    Recompute dsa_features in the database:
+    DELETE + INSERT ... SELECT in one transaction.
+    """
+    engine = get_engine()
+    cols = ", ".join(FEATURE_COLUMNS)
+
+    with engine.begin() as conn:
+        ensure_feature_columns(conn)
+        conn.exec_driver_sql("DELETE FROM dsa_features")
+        rows = conn.exec_driver_sql(
+            f"INSERT INTO dsa_features ({cols}) "
+            f"SELECT {cols} FROM ({features_select_sql()}) f"
+        ).rowcount
+
+    engine.dispose()
+    print(f"[FE] SQL feature engine completed ({rows} rows).")
@@ -1,14 +1,17 @@
 # pipeline/train_model.py
 import os
+import copy
+import time
+
 import pandas as pd
-import joblib
-from sklearn.ensemble import RandomForestRegressor
-from sqlalchemy import text
 
 from database import get_engine
+from pipeline.schema import read_table, memory_report
+from pipeline.model_registry import (
+    MODEL_FILE, save_model, get_model, load_meta, log_training_run,
+    load_tuned_config
+)
 
-ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-MODEL_FILE = os.path.join(ROOT, "model", "model.pkl")
 
 FEATURE_COLS = [
     "total_solved", "easy_solved", "medium_solved", "hard_solved",
@@ -18,39 +21,184 @@ FEATURE_COLS = [
     "consistency_score", "hard_problem_density", "rolling_growth_3week",
 ]
 
+# Model family: "rf" (RandomForestRegressor) or "hgb" (HistGradientBoostingRegressor)
+TRAIN_ENGINE = os.getenv("TRAIN_ENGINE", "rf")
+
+# Cores used by the forest (-1 = all)
+TRAIN_N_JOBS = int(os.getenv("TRAIN_N_JOBS", "-1"))
+
+# Trees (rf) / boosting iterations (hgb) for a full fit
+TRAIN_N_ESTIMATORS = int(os.getenv("TRAIN_N_ESTIMATORS", "200"))
+
+# rf only: when new rows arrived, add this many trees to the previous
+# forest instead of refitting, up to TRAIN_MAX_TREES. The new trees are
+# fitted on the last TRAIN_WARM_WINDOW_DAYS of rows (new and old), not
+# just the new day, so each one still sees several weeks of behaviour.
+TRAIN_WARM_START = os.getenv("TRAIN_WARM_START", "1") == "1"
+TRAIN_WARM_TREES = int(os.getenv("TRAIN_WARM_TREES", "20"))
+TRAIN_MAX_TREES = int(os.getenv("TRAIN_MAX_TREES", "400"))
+TRAIN_WARM_WINDOW_DAYS = int(os.getenv("TRAIN_WARM_WINDOW_DAYS", "28"))
+
+# Wall-clock budget for fitting (0 = none). The model is grown in steps
+# of TRAIN_BUDGET_STEP trees / iterations and stops once over budget.
+TRAIN_BUDGET_SECONDS = float(os.getenv("TRAIN_BUDGET_SECONDS", "0"))
+TRAIN_BUDGET_STEP = 25
+
+
+def build_model(engine=None, n_estimators=None, tuned=True, **params):
+    """
+    Unfitted model for `engine`; sklearn is only imported here.
+    Hyperparameters promoted by tune_model for this engine apply unless
+    tuned=False; explicit keyword arguments override them.
+    """
+    engine = engine or TRAIN_ENGINE
+    n_estimators = n_estimators or TRAIN_N_ESTIMATORS
+
+    config = load_tuned_config() if tuned else {}
+    if config.get("engine") == engine:
+        params = {**config["params"], **params}
+
+    if engine == "hgb":
+        from sklearn.ensemble import HistGradientBoostingRegressor
+        return HistGradientBoostingRegressor(
+            max_iter=n_estimators, random_state=42, **params
+        )
+
+    from sklearn.ensemble import RandomForestRegressor
+    return RandomForestRegressor(
+        n_estimators=n_estimators,
+        n_jobs=TRAIN_N_JOBS,
+        random_state=42,
+        **params
+    )
+
+
+def _size_param(model):
+    return "max_iter" if "max_iter" in model.get_params() else "n_estimators"
+
+
+def fit_budgeted(model, X, y, budget_seconds=None):
+    """
+    Fit `model`, growing it TRAIN_BUDGET_STEP trees / iterations at a
+    time via warm_start while within budget. Returns the model; its size
+    parameter reflects what was actually grown, and warm_start is off
+    again so a later fit() on the saved model starts from scratch.
+    """
+    budget = TRAIN_BUDGET_SECONDS if budget_seconds is None else budget_seconds
+    if not budget:
+        return model.fit(X, y)
+
+    param = _size_param(model)
+    target = model.get_params()[param]
+    deadline = time.monotonic() + budget
+
+    size = min(TRAIN_BUDGET_STEP, target)
+    model.set_params(warm_start=True, **{param: size})
+    model.fit(X, y)
+
+    while size < target and time.monotonic() < deadline:
+        size = min(size + TRAIN_BUDGET_STEP, target)
+        model.set_params(**{param: size})
+        model.fit(X, y)
+
+    model.set_params(warm_start=False)
+    if size < target:
+        print(f"[train] Budget of {budget:g}s reached at {size}/{target} {param}")
+    return model
 
-def train():
+
+def _warm_start_model(df):
+    """
+    (previous forest, rows to fit the added trees on) when rows arrived
+    since the forest was trained and it can still grow, else
+    (None, None). The rows are the last TRAIN_WARM_WINDOW_DAYS days.
+    """
+    meta = load_meta()
+    if not (
+        TRAIN_WARM_START
+        and TRAIN_ENGINE == "rf"
+        and meta.get("engine") == "rf"
+        and meta.get("feature_cols") == FEATURE_COLS
+        and meta.get("trained_through")
+    ):
+        return None, None
+
+    latest = df["date"].max()
+    if latest <= pd.Timestamp(meta["trained_through"]):
+        return None, None
+
+    try:
+        model, _ = get_model()
+    except (FileNotFoundError, OSError):
+        return None, None
+
+    if model.n_estimators + TRAIN_WARM_TREES > TRAIN_MAX_TREES:
+        return None, None
+
+    window = df[df["date"] > latest - pd.Timedelta(days=TRAIN_WARM_WINDOW_DAYS)]
+
+    # the registry's instance may be serving predictions in this process
+    return copy.deepcopy(model), window
+
+
+def train(full_refit=False):
     engine = get_engine()
 
-    # Read feature data from MySQL
+    # Read feature data
     try:
-        df = pd.read_sql(text("SELECT * FROM dsa_features ORDER BY username, week"), engine)
+        df = read_table(engine, "dsa_features", cols=["username", "date"] + FEATURE_COLS)
     except Exception as e:
         print("[train] Error reading dsa_features:", e)
         engine.dispose()
         return
 
+    # Dispose DB engine to prevent huggingface disconnect issues
+    engine.dispose()
+
     if df.empty:
         print("[train] No feature rows found.")
-        engine.dispose()
         return
 
-    # Prepare training data
-    X = df[FEATURE_COLS].fillna(0)
-    y = df["weekly_growth"].fillna(0)
+    memory_report(df, "train dsa_features")
 
-    # Train model
-    model = RandomForestRegressor(
-        n_estimators=200,
-        random_state=42,
-    )
-    model.fit(X, y)
+    # -------------------------------------------------
+    # Fit: grow the previous forest, or a full (budgeted) fit
+    # -------------------------------------------------
+    model, fit_rows = (None, None) if full_refit else _warm_start_model(df)
+    started = time.perf_counter()
 
-    # Save model
-    os.makedirs(os.path.dirname(MODEL_FILE), exist_ok=True)
-    joblib.dump(model, MODEL_FILE)
-    print("[train] Model saved:", MODEL_FILE)
+    if model is not None:
+        mode = "warm_start"
+        model.set_params(
+            warm_start=True, n_jobs=TRAIN_N_JOBS,
+            n_estimators=model.n_estimators + TRAIN_WARM_TREES
+        )
+        model.fit(fit_rows[FEATURE_COLS].fillna(0), fit_rows["weekly_growth"].fillna(0))
+        model.set_params(warm_start=False)
+    else:
+        mode = "full"
+        fit_rows = df
+        model = fit_budgeted(
+            build_model(), df[FEATURE_COLS].fillna(0), df["weekly_growth"].fillna(0)
+        )
 
-    # Dispose DB engine to prevent huggingface disconnect issues
-    engine.dispose()
+    fit_seconds = round(time.perf_counter() - started, 3)
 
+    # Save model (+ version sidecar read by the model registry)
+    meta = save_model(
+        model,
+        engine=TRAIN_ENGINE,
+        mode=mode,
+        rows=len(fit_rows),
+        size=model.get_params()[_size_param(model)],
+        fit_seconds=fit_seconds,
+        trained_through=df["date"].max().date().isoformat(),
+        feature_cols=FEATURE_COLS,
+    )
+    log_training_run(meta)
+
+    print(
+        f"[train] Model saved: {MODEL_FILE} (version {meta['version']}, "
+        f"{TRAIN_ENGINE} {mode}, {meta['size']} trees/iters on {len(fit_rows)} rows, "
+        f"{fit_seconds}s, {meta['model_bytes'] / 1e6:.1f} MB)"
+    )
@@ -0,0 +1,182 @@
+# pipeline/tree_export.py
+"""
+Flat NumPy export of a fitted tree forest, and a pure-NumPy predictor.
+
+export_forest() packs every tree of a RandomForestRegressor into shared
+node arrays (feature, threshold, left, right, value) plus each tree's
+root, saved as an uncompressed .npz. load_forest() memory-maps those
+arrays straight out of the zip (the members are stored, not deflated),
+so serving predictions needs neither scikit-learn nor an unpickle.
+
+Leaves point to themselves, so a batch of rows can walk every tree in
+lock-step for max_depth steps. Like scikit-learn, X is compared as
+float32 against the float64 thresholds (X <= threshold goes left), and
+NaN follows each node's missing_left flag (scikit-learn's
+missing_go_to_left; forests exported before it was stored send NaN
+right).
+"""
+import os
+import zipfile
+
+import numpy as np
+
+FOREST_ARRAYS = ("feature", "threshold", "left", "right", "value", "roots")
+
+# Optional arrays: absent from older exports
+OPTIONAL_ARRAYS = ("missing_left",)
+
+# Rows walked through the forest at once (bounds the (rows, trees) buffer)
+PREDICT_BATCH = 4096
+
+
+def export_forest(model, path, version=None):
+    """
+    Flatten model.estimators_ into `path` (.npz). Returns the node count.
+    """
+    feature, threshold, left, right, value, roots = [], [], [], [], [], []
+    missing_left = []
+    offset = 0
+    max_depth = 0
+
+    for est in model.estimators_:
+        tree = est.tree_
+        n = tree.node_count
+        own = np.arange(n, dtype=np.int64) + offset
+        is_leaf = tree.children_left == -1
+
+        feature.append(np.where(is_leaf, 0, tree.feature).astype(np.int32))
+        threshold.append(tree.threshold.astype(np.float64))
+        left.append(np.where(is_leaf, own, tree.children_left + offset).astype(np.int32))
+        right.append(np.where(is_leaf, own, tree.children_right + offset).astype(np.int32))
+        value.append(tree.value[:, 0, 0].astype(np.float64))
+        missing_left.append(
+            np.asarray(getattr(tree, "missing_go_to_left", np.zeros(n)), dtype=np.bool_)
+            & ~is_leaf
+        )
+        roots.append(offset)
+
+        max_depth = max(max_depth, tree.max_depth)
+        offset += n
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp.npz"
+    np.savez(
+        tmp,
+        feature=np.concatenate(feature),
+        threshold=np.concatenate(threshold),
+        left=np.concatenate(left),
+        right=np.concatenate(right),
+        value=np.concatenate(value),
+        missing_left=np.concatenate(missing_left),
+        roots=np.array(roots, dtype=np.int32),
+        max_depth=np.array(max_depth, dtype=np.int32),
+        n_features=np.array(model.n_features_in_, dtype=np.int32),
+        version=np.array(version or ""),
+    )
+    os.replace(tmp, path)
+    return offset
+
+
+def _mmap_member(path, zf, name):
+    """Memory-map one stored .npy member of an uncompressed .npz."""
+    info = zf.getinfo(f"{name}.npy")
+    if info.compress_type != zipfile.ZIP_STORED:
+        return np.load(zf.open(info))
+
+    with open(path, "rb") as f:
+        # local file header: 30 bytes + file name + extra field
+        f.seek(info.header_offset + 26)
+        name_len, extra_len = np.frombuffer(f.read(4), dtype="<u2")
+        f.seek(info.header_offset + 30 + int(name_len) + int(extra_len))
+
+        version = np.lib.format.read_magic(f)
+        if version == (1, 0):
+            shape, fortran, dtype = np.lib.format.read_array_header_1_0(f)
+        else:
+            shape, fortran, dtype = np.lib.format.read_array_header_2_0(f)
+        data_offset = f.tell()
+
+    if dtype.hasobject:
+        raise ValueError(f"{name} is not a plain array")
+    if not shape or 0 in shape:
+        return np.load(zf.open(info))
+
+    return np.memmap(
+        path, dtype=dtype, mode="r", offset=data_offset, shape=shape,
+        order="F" if fortran else "C"
+    )
+
+
+class ForestArrays:
+    """Forest loaded by load_forest(); predict() mirrors the sklearn model."""
+
+    def __init__(self, arrays, max_depth, n_features, version):
+        self.feature = arrays["feature"]
+        self.threshold = arrays["threshold"]
+        self.left = arrays["left"]
+        self.right = arrays["right"]
+        self.value = arrays["value"]
+        self.roots = arrays["roots"]
+        self.missing_left = arrays.get("missing_left")
+        self.max_depth = max_depth
+        self.n_features = n_features
+        self.version = version
+
+    @property
+    def n_trees(self):
+        return len(self.roots)
+
+    def predict(self, X):
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+
+        out = np.empty(len(X), dtype=np.float64)
+        for start in range(0, len(X), PREDICT_BATCH):
+            out[start:start + PREDICT_BATCH] = self._predict_batch(
+                X[start:start + PREDICT_BATCH]
+            )
+        return out
+
+    def _predict_batch(self, X):
+        flat = np.ascontiguousarray(X).ravel()
+        row_offset = (np.arange(len(X), dtype=np.int64) * X.shape[1])[:, None]
+        node = np.broadcast_to(self.roots, (len(X), self.n_trees)).copy()
+
+        # Leaves loop to themselves, so max_depth steps reach every leaf;
+        # only the (row, tree) pairs still on an inner node are advanced
+        node = node.ravel()
+        active = node.copy()
+        where = np.arange(node.size)
+        offsets = np.broadcast_to(row_offset, (len(X), self.n_trees)).ravel()
+
+        for _ in range(self.max_depth):
+            x = flat[offsets[where] + self.feature[active]]
+            go_left = x <= self.threshold[active]
+            if self.missing_left is not None:
+                go_left |= np.isnan(x) & self.missing_left[active]
+            nxt = np.where(go_left, self.left[active], self.right[active])
+            node[where] = nxt
+
+            moving = nxt != active
+            if not moving.all():
+                where, nxt = where[moving], nxt[moving]
+            if not where.size:
+                break
+            active = nxt
+
+        return self.value[node].reshape(len(X), self.n_trees).mean(axis=1)
+
+
+def load_forest(path) -> ForestArrays:
+    with zipfile.ZipFile(path) as zf:
+        arrays = {name: _mmap_member(path, zf, name) for name in FOREST_ARRAYS}
+        names = set(zf.namelist())
+        for name in OPTIONAL_ARRAYS:
+            if f"{name}.npy" in names:
+                arrays[name] = _mmap_member(path, zf, name)
+        max_depth = int(np.load(zf.open("max_depth.npy")))
+        n_features = int(np.load(zf.open("n_features.npy")))
+        version = str(np.load(zf.open("version.npy")))
+
+    return ForestArrays(arrays, max_depth, n_features, version)
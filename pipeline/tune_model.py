@@ -0,0 +1,365 @@
+# pipeline/tune_model.py
+"""
+Optional hyperparameter search for the training engine.
+
+Successive halving: every candidate is scored on a small sample of the
+training rows, the best 1/TUNE_ETA survive to a rung with TUNE_ETA times
+more rows, until one remains. Scores are mean absolute errors over
+forward-chaining splits on calendar weeks (Monday starts) of each row's
+date; each fold trains on earlier weeks and validates on the following
+ones, so a user's future never leaks into their past. Candidate fits fan
+out over a process pool and stop being scheduled once TUNE_CPU_SECONDS
+of worker CPU time is spent. The wall clock is bounded too: at
+TUNE_CPU_SECONDS / workers seconds nothing more is waited for and
+still-running fits are killed.
+
+The winner is promoted (tuned_config.json + a refit model.pkl) only if
+it beats the current configuration on the same folds.
+
+    python -m pipeline.tune_model [--engine rf|hgb] [--cpu-seconds 600]
+"""
+import os
+import time
+import random
+import argparse
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+import numpy as np
+import pandas as pd
+
+from database import get_engine
+from pipeline.schema import read_table
+from pipeline.model_registry import (
+    save_model, save_tuned_config, load_tuned_config, log_training_run
+)
+from pipeline.train_model import FEATURE_COLS, TRAIN_ENGINE, build_model
+
+# Candidates sampled from the search space
+TUNE_CANDIDATES = int(os.getenv("TUNE_CANDIDATES", "16"))
+
+# Keep 1/TUNE_ETA of the candidates per rung
+TUNE_ETA = int(os.getenv("TUNE_ETA", "3"))
+
+# Forward-chaining folds
+TUNE_SPLITS = int(os.getenv("TUNE_SPLITS", "3"))
+
+# Total worker CPU seconds; wall time is cut off at budget / workers
+TUNE_CPU_SECONDS = float(os.getenv("TUNE_CPU_SECONDS", "600"))
+TUNE_WORKERS = int(os.getenv("TUNE_WORKERS", str(os.cpu_count() or 1)))
+
+# Trees / iterations per candidate fit (kept small; train() sets the final size)
+TUNE_N_ESTIMATORS = 60
+
+SEARCH_SPACES = {
+    "rf": {
+        "max_depth": [None, 6, 10, 16],
+        "min_samples_leaf": [1, 2, 5, 10],
+        "max_features": [1.0, 0.7, 0.5, "sqrt"],
+    },
+    "hgb": {
+        "learning_rate": [0.03, 0.06, 0.1, 0.2],
+        "max_leaf_nodes": [15, 31, 63],
+        "min_samples_leaf": [10, 20, 50],
+        "l2_regularization": [0.0, 0.1, 1.0],
+    },
+}
+
+# Per-worker training data (set once by the pool initializer)
+_data = {}
+
+
+def forward_chaining_splits(week_start, n_splits):
+    """
+    [(train_idx, val_idx)]: the sorted distinct week starts are cut
+    into n_splits + 1 blocks; fold k trains on blocks <= k and
+    validates on block k + 1.
+    """
+    weeks = np.unique(week_start)
+    blocks = np.array_split(weeks, n_splits + 1)
+
+    folds = []
+    for k in range(n_splits):
+        cutoff = blocks[k + 1][0] if len(blocks[k + 1]) else None
+        if cutoff is None:
+            continue
+        end = blocks[k + 2][0] if k + 2 < len(blocks) and len(blocks[k + 2]) else None
+
+        train_idx = np.flatnonzero(week_start < cutoff)
+        val_mask = week_start >= cutoff
+        if end is not None:
+            val_mask &= week_start < end
+        val_idx = np.flatnonzero(val_mask)
+
+        if len(train_idx) and len(val_idx):
+            folds.append((train_idx, val_idx))
+    return folds
+
+
+def _init_worker(X, y, folds):
+    _data.update(X=X, y=y, folds=folds)
+
+
+def week_starts(dates):
+    """Monday of each date's calendar week (the fold unit)."""
+    return pd.to_datetime(dates).dt.to_period("W").dt.start_time.to_numpy()
+
+
+def _stop_pool(pool):
+    """
+    Cancel queued fits and kill running ones: once tuning has its
+    answer (or hit its deadline) nothing else in the pool is needed.
+    """
+    terminate = getattr(pool, "terminate_workers", None)  # Python 3.14+
+    pool.shutdown(wait=False, cancel_futures=True)
+    if terminate is not None:
+        terminate()
+    else:
+        for proc in list((pool._processes or {}).values()):
+            proc.terminate()
+    pool.shutdown(wait=True)
+
+
+def _score(engine, params, fraction, seed=42):
+    """
+    Mean validation MAE over the folds, training on `fraction` of each
+    fold's training rows. Runs in a worker; returns (mae, cpu seconds).
+    """
+    started = time.process_time()
+    X, y, folds = _data["X"], _data["y"], _data["folds"]
+    rng = np.random.default_rng(seed)
+
+    errors = []
+    for train_idx, val_idx in folds:
+        n = max(50, int(len(train_idx) * fraction))
+        if n < len(train_idx):
+            train_idx = np.sort(rng.choice(train_idx, n, replace=False))
+
+        model = build_model(engine, TUNE_N_ESTIMATORS, tuned=False, **params)
+        if "n_jobs" in model.get_params():
+            model.set_params(n_jobs=1)  # the pool provides the parallelism
+        model.fit(X[train_idx], y[train_idx])
+        errors.append(np.abs(model.predict(X[val_idx]) - y[val_idx]).mean())
+
+    return float(np.mean(errors)), time.process_time() - started
+
+
+def sample_candidates(engine, n, seed=42):
+    space = SEARCH_SPACES[engine]
+    rng = random.Random(seed)
+    seen, candidates = set(), []
+
+    for _ in range(n * 20):
+        params = {k: rng.choice(v) for k, v in space.items()}
+        key = tuple(sorted(params.items(), key=lambda kv: kv[0]))
+        if key not in seen:
+            seen.add(key)
+            candidates.append(params)
+        if len(candidates) == n:
+            break
+    return candidates
+
+
+def successive_halving(pool, engine, candidates, cpu_budget, deadline, baseline):
+    """
+    Returns (best params, best mae, fraction it was scored on,
+    cpu seconds used, rungs completed, baseline mae).
+
+    `baseline` is the already-submitted future scoring the current
+    configuration; its CPU time counts against the budget as soon as it
+    finishes. Stops scheduling new fits once the CPU or wall budget is
+    spent; the best candidate of the last completed rung wins. Nothing
+    is waited for past `deadline`, so best mae / baseline mae are None
+    if those fits hadn't finished by then.
+    """
+    rungs = max(1, int(np.ceil(np.log(len(candidates)) / np.log(TUNE_ETA))))
+    survivors = [(params, None) for params in candidates]
+    best_fraction = 0.0
+    baseline_mae = None
+    cpu_used = 0.0
+    completed = 0
+
+    def _collect_baseline():
+        nonlocal baseline_mae, cpu_used
+        if baseline_mae is None and baseline.done():
+            baseline_mae, cpu = baseline.result()
+            cpu_used += cpu
+
+    for rung in range(rungs + 1):
+        # a lone survivor goes straight to the full sample
+        fraction = 1.0 if len(survivors) == 1 else min(1.0, TUNE_ETA ** (rung - rungs))
+        pending = {
+            pool.submit(_score, engine, params, fraction): params
+            for params, _ in survivors
+        }
+        scored = []
+
+        while pending:
+            waiting = set(pending) | ({baseline} if baseline_mae is None else set())
+            done, _ = wait(
+                waiting, timeout=max(0.0, deadline - time.monotonic()),
+                return_when=FIRST_COMPLETED
+            )
+            _collect_baseline()
+            for future in done:
+                if future is baseline:
+                    continue
+                params = pending.pop(future)
+                mae, cpu = future.result()
+                cpu_used += cpu
+                scored.append((params, mae))
+
+            if cpu_used >= cpu_budget or time.monotonic() >= deadline:
+                for future in pending:
+                    future.cancel()
+                pending = {}
+
+        if not scored:
+            break
+
+        scored.sort(key=lambda s: s[1])
+        print(
+            f"[tune] rung {rung}: {len(scored)} candidates on {fraction:.0%} of rows, "
+            f"best MAE {scored[0][1]:.4f}"
+        )
+        survivors = scored[:max(1, len(scored) // TUNE_ETA)]
+        best_fraction = fraction
+        completed += 1
+
+        if len(survivors) == 1 and fraction >= 1.0:
+            break
+        if cpu_used >= cpu_budget or time.monotonic() >= deadline:
+            print("[tune] CPU or wall budget spent, stopping early")
+            break
+
+    if baseline_mae is None:
+        wait([baseline], timeout=max(0.0, deadline - time.monotonic()))
+        _collect_baseline()
+
+    best_params, best_mae = survivors[0]
+    return best_params, best_mae, best_fraction, cpu_used, completed, baseline_mae
+
+
+def tune(engine=None, cpu_seconds=None, workers=None):
+    engine = engine or TRAIN_ENGINE
+    cpu_budget = TUNE_CPU_SECONDS if cpu_seconds is None else cpu_seconds
+    workers = max(1, workers or TUNE_WORKERS)
+
+    db = get_engine()
+    df = read_table(
+        db, "dsa_features",
+        cols=["username", "date"] + FEATURE_COLS
+    )
+    db.dispose()
+
+    if df.empty:
+        print("[tune] No feature rows found.")
+        return None
+
+    X = df[FEATURE_COLS].fillna(0).to_numpy(dtype=np.float32)
+    y = df["weekly_growth"].fillna(0).to_numpy(dtype=np.float64)
+    folds = forward_chaining_splits(week_starts(df["date"]), TUNE_SPLITS)
+    if not folds:
+        print("[tune] Not enough distinct weeks for forward-chaining splits.")
+        return None
+
+    current = load_tuned_config()
+    current_params = current.get("params", {}) if current.get("engine") == engine else {}
+
+    started = time.monotonic()
+    deadline = started + cpu_budget / workers
+
+    pool = ProcessPoolExecutor(
+        max_workers=workers, initializer=_init_worker, initargs=(X, y, folds)
+    )
+    try:
+        # the configuration train() uses today, on the same folds (first
+        # in the queue; its CPU time counts against the budget)
+        baseline = pool.submit(_score, engine, current_params, 1.0)
+
+        best_params, best_mae, fraction, cpu_used, rungs, baseline_mae = (
+            successive_halving(
+                pool, engine, sample_candidates(engine, TUNE_CANDIDATES),
+                cpu_budget, deadline, baseline
+            )
+        )
+
+        # A winner from a subsampled rung isn't comparable with the
+        # baseline's full-data score: re-score it if budget remains
+        if (
+            best_mae is not None and fraction < 1.0
+            and cpu_used < cpu_budget and time.monotonic() < deadline
+        ):
+            rescore = pool.submit(_score, engine, best_params, 1.0)
+            if wait([rescore], timeout=max(0.0, deadline - time.monotonic())).done:
+                best_mae, cpu = rescore.result()
+                cpu_used += cpu
+                fraction = 1.0
+    finally:
+        _stop_pool(pool)
+
+    if best_mae is None:
+        print("[tune] Budget ran out before any candidate was scored.")
+        return None
+
+    report = {
+        "engine": engine,
+        "params": best_params,
+        "cv_mae": round(best_mae, 6),
+        "cv_fraction": fraction,
+        "baseline_params": current_params,
+        "baseline_cv_mae": None if baseline_mae is None else round(baseline_mae, 6),
+        "folds": len(folds),
+        "rungs": rungs,
+        "cpu_seconds": round(cpu_used, 1),
+        "wall_seconds": round(time.monotonic() - started, 1),
+    }
+    print(
+        f"[tune] best {best_params} MAE {best_mae:.4f} vs current "
+        f"{report['baseline_cv_mae']} ({report['cpu_seconds']} CPU s, {rungs} rungs)"
+    )
+
+    if fraction < 1.0:
+        print("[tune] Budget ran out before the winner was scored on all rows; "
+              "current configuration kept.")
+        report["promoted"] = False
+        return report
+
+    if baseline_mae is None:
+        print("[tune] Current configuration was not scored before the deadline; kept.")
+        report["promoted"] = False
+        return report
+
+    if best_mae >= baseline_mae:
+        print("[tune] Current configuration kept.")
+        report["promoted"] = False
+        return report
+
+    # Promote: remember the config and refit the served model with it
+    save_tuned_config(report)
+    model = build_model(engine).fit(df[FEATURE_COLS].fillna(0), y)
+    meta = save_model(
+        model,
+        engine=engine,
+        mode="tuned",
+        rows=len(df),
+        size=model.get_params().get("n_estimators", model.get_params().get("max_iter")),
+        params=best_params,
+        cv_mae=report["cv_mae"],
+        trained_through=df["date"].max().date().isoformat(),
+        feature_cols=FEATURE_COLS,
+    )
+    log_training_run(meta)
+    print(f"[tune] Promoted new configuration (model version {meta['version']})")
+
+    report["promoted"] = True
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--engine", choices=sorted(SEARCH_SPACES))
+    parser.add_argument("--cpu-seconds", type=float)
+    parser.add_argument("--workers", type=int)
+    args = parser.parse_args()
+
+    tune(args.engine, args.cpu_seconds, args.workers)
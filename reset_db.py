@@ -6,6 +6,10 @@ def reset_database():
     with engine.begin() as conn:
         conn.exec_driver_sql("DELETE FROM dsa_data;")
         conn.exec_driver_sql("DELETE FROM dsa_features;")
+        conn.exec_driver_sql("DELETE FROM feature_fingerprints;")
+        conn.exec_driver_sql("DELETE FROM dsa_weekly;")
+        conn.exec_driver_sql("DELETE FROM dsa_monthly;")
+        conn.exec_driver_sql("DELETE FROM predictions;")
         conn.exec_driver_sql("ALTER TABLE dsa_data AUTO_INCREMENT = 1;")
         conn.exec_driver_sql("ALTER TABLE dsa_features AUTO_INCREMENT = 1;")
 
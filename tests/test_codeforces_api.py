@@ -0,0 +1,65 @@
+import zlib
+
+from utils.codeforces_api import encode_solved, decode_solved
+
+
+def test_round_trip():
+    solved = {(1, "A"), (1850, "B2"), ("gym", "C"), (None, "D")}
+    assert decode_solved(encode_solved(solved)) == solved
+
+
+def test_round_trip_empty():
+    assert decode_solved(encode_solved(set())) == set()
+    assert decode_solved(None) == set()
+
+
+def test_contest_less_problem_has_one_key():
+    # older versions stored contest-less problems as "None/<index>"
+    legacy = zlib.compress(b"None/A,/A")
+    assert decode_solved(legacy) == {(None, "A")}
+
+
+def test_fetch_many_rechecks_pending_verdicts(monkeypatch):
+    import utils.codeforces_api as cf
+
+    fetched = []
+    monkeypatch.setattr(
+        cf, "_last_online", lambda handles: {h: 1_000 for h in handles}
+    )
+    monkeypatch.setattr(cf, "classify_solved", lambda solved, index=None: None)
+    monkeypatch.setattr(
+        cf, "fetch_codeforces_stats",
+        lambda handle, state=None: fetched.append(handle) or {"handle": handle}
+    )
+
+    state = {"last_submission_id": 5, "solved": set(), "checked_at": 10_000}
+    results = cf.fetch_codeforces_many(
+        ["a", "b", "c"],
+        {
+            "a": state,
+            "b": {**state, "pending": True},
+            # online shortly before our check: within the clock-skew margin
+            "c": {**state, "checked_at": 1_000 + cf.LAST_ONLINE_MARGIN // 2},
+        }
+    )
+
+    assert fetched == ["b", "c"]
+    assert results["a"]["sync_state"]["last_submission_id"] == 5
+
+
+def test_parse_raw_needs_history_and_archived_index():
+    import pytest
+    from utils.codeforces_api import parse_raw
+
+    sub = {"id": 7, "verdict": "OK", "problem": {"contestId": 1, "index": "A"}}
+    index = {(1, "A"): "easy"}
+
+    first = parse_raw({"from_submission_id": 0, "submissions": [sub]}, None, index)
+    assert first["total_solved"] == 1 and first["easy_solved"] == 1
+
+    # read after a watermark the replay never saw: totals would be partial
+    with pytest.raises(ValueError):
+        parse_raw({"from_submission_id": 5, "submissions": [sub]}, None, index)
+
+    with pytest.raises(ValueError):
+        parse_raw({"from_submission_id": 0, "submissions": [sub]}, None, None)
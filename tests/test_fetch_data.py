@@ -0,0 +1,25 @@
+import pipeline.fetch_data as fd
+
+
+def test_breaker_rejections_are_skipped_not_failed(monkeypatch):
+    profiles = [
+        {"username": u, "platform": "leetcode", "platform_username": u}
+        for u in ("a", "b", "c")
+    ]
+    # "b" fails, "c" is rejected by the breaker (left out of the batch)
+    monkeypatch.setattr(
+        fd, "fetch_many_platform_stats",
+        lambda platform, handles, states: {
+            h: {"total_solved": 1} if h == "a" else None
+            for h in handles if h != "c"
+        }
+    )
+
+    results, skipped = fd.fetch_stats_concurrently(
+        profiles, max_workers=1, rate_limits={}
+    )
+
+    assert [(r["platform_username"], s) for r, s in results] == [
+        ("a", {"total_solved": 1}), ("b", None)
+    ]
+    assert [r["platform_username"] for r in skipped] == ["c"]
@@ -0,0 +1,65 @@
+import time
+
+import pytest
+import requests
+
+import utils.http_client as hc
+
+
+class DeadSession:
+    def __init__(self):
+        self.calls = 0
+
+    def get(self, *args, **kwargs):
+        self.calls += 1
+        raise requests.ConnectionError("down")
+
+
+@pytest.fixture
+def dead_upstream(monkeypatch):
+    session = DeadSession()
+    monkeypatch.setattr(hc, "get_session", lambda: session)
+    monkeypatch.setattr(hc, "_backoff", lambda attempt, retry_after=None: 0)
+    return session
+
+
+def test_each_failed_attempt_counts_toward_the_breaker(dead_upstream):
+    breaker = hc.get_breaker("test-dead")
+
+    with pytest.raises(requests.ConnectionError):
+        hc.http_get("test-dead", "k", "http://upstream.invalid/a", ttl=0)
+    assert dead_upstream.calls == hc.MAX_RETRIES + 1
+    assert breaker.failures == hc.MAX_RETRIES + 1
+
+    # retrying stops as soon as the breaker opens
+    with pytest.raises(requests.ConnectionError):
+        hc.http_get("test-dead", "k", "http://upstream.invalid/a", ttl=0)
+    assert breaker.state == "open"
+    assert dead_upstream.calls == hc.BREAKER_THRESHOLD
+
+    with pytest.raises(hc.CircuitOpenError):
+        hc.http_get("test-dead", "k", "http://upstream.invalid/a", ttl=0)
+
+
+def test_no_request_after_the_deadline(dead_upstream):
+    hc.set_deadline(time.monotonic() - 1)
+    try:
+        with pytest.raises(hc.DeadlineExceededError):
+            hc.http_get("test-deadline", "k", "http://upstream.invalid/a", ttl=0)
+    finally:
+        hc.set_deadline(None)
+    assert dead_upstream.calls == 0
+
+
+def test_half_open_trial_is_released_on_any_exception(monkeypatch):
+    breaker = hc.get_breaker("test-trial")
+    breaker.state, breaker._opened_at = "open", time.monotonic() - breaker.cooldown
+
+    def boom(*args, **kwargs):
+        raise ValueError("not an upstream failure")
+
+    monkeypatch.setattr(hc, "_get_with_retries", boom)
+    with pytest.raises(ValueError):
+        hc.http_get("test-trial", "k", "http://upstream.invalid/a", ttl=0)
+
+    assert breaker.allow()
@@ -0,0 +1,24 @@
+import pandas as pd
+import pytest
+
+from benchmarks.bench_sql_features import compare, sqlite_connect
+from benchmarks.synthetic import generate_snapshots
+from pipeline.feature_engineering import compute_features
+from pipeline.sql_features import features_select_sql
+
+
+@pytest.mark.parametrize("seed", [1, 7])
+def test_sql_engine_matches_pandas_engine(seed):
+    raw = generate_snapshots(25, 40, seed=seed)
+    raw["date"] = raw["date"].astype(str)
+    raw["week_start_date"] = raw["week_start_date"].astype(str)
+
+    conn = sqlite_connect()
+    raw.to_sql("dsa_data", conn, index=False)
+    sql_df = pd.read_sql(
+        f"SELECT * FROM ({features_select_sql()}) ORDER BY username, date", conn
+    )
+    pandas_df = compute_features(raw.copy()).reset_index(drop=True)
+
+    assert len(sql_df) == len(pandas_df) == len(raw)
+    assert compare(sql_df, pandas_df) == {}
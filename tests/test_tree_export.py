@@ -0,0 +1,30 @@
+import numpy as np
+from sklearn.ensemble import RandomForestRegressor
+
+from pipeline.tree_export import export_forest, load_forest
+
+
+def test_exported_forest_predicts_like_sklearn(tmp_path):
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(300, 6)).astype(np.float32)
+    X[rng.random(X.shape) < 0.2] = 0.0
+    y = X[:, 0] * 2 + np.where(X[:, 1] > 0, 3.0, -1.0) + rng.normal(size=300)
+
+    model = RandomForestRegressor(n_estimators=15, max_depth=8, random_state=0)
+    model.fit(X, y)
+
+    path = tmp_path / "forest.npz"
+    nodes = export_forest(model, str(path), "v-test")
+    forest = load_forest(str(path))
+
+    assert nodes == sum(e.tree_.node_count for e in model.estimators_)
+    assert forest.n_trees == 15 and forest.version == "v-test"
+
+    # an all-zero row, an all-NaN row and a partly missing row
+    probe = np.vstack([X[:50], np.zeros((1, 6)), np.full((1, 6), np.nan),
+                       [[np.nan, 1.0, 0.0, np.nan, -1.0, 0.5]]])
+    probe = probe.astype(np.float32)
+
+    # tree means may differ in the last bits (summation order)
+    np.testing.assert_allclose(forest.predict(probe), model.predict(probe), rtol=0, atol=1e-9)
+    np.testing.assert_allclose(forest.predict(probe[0]), model.predict(probe[:1]), rtol=0, atol=1e-9)
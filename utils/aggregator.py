@@ -1,33 +1,136 @@
 # utils/aggregator.py
+import importlib
+import threading
 
-from utils.leetcode_api import fetch_profile_counts
-# (future)
-from utils.codeforces_api import fetch_codeforces_stats
-from utils.gfg_api import fetch_gfg_stats
-from utils.hackerrank_api import fetch_hackerrank_stats
+from utils.circuit_breaker import CallRejectedError
 
 
-def fetch_all_platform_stats(platform: str, username: str):
+# -------------------------------------------------
+# Adapter registry
+# -------------------------------------------------
+# Modules are imported on first use, so loading the aggregator doesn't
+# pull in every platform's dependencies.
+#
+# capabilities:
+#   difficulty_split – fills easy/medium/hard, not just total_solved
+#   incremental      – fetch accepts the previous sync `state`
+#   batch            – exposes fetch_many(handles, states) for bulk lookups
+#
+# Every adapter attaches the upstream payload to its stats under "raw"
+# and exposes parse(raw, state) to re-derive stats from an archived one.
+ADAPTERS = {
+    "leetcode": {
+        "module": "utils.leetcode_api",
+        "fetch": "fetch_profile_counts",
+        "parse": "parse_raw",
+        "capabilities": {"difficulty_split"},
+    },
+    "codeforces": {
+        "module": "utils.codeforces_api",
+        "fetch": "fetch_codeforces_stats",
+        "parse": "parse_raw",
+        "fetch_many": "fetch_codeforces_many",
+        "capabilities": {"difficulty_split", "incremental", "batch"},
+    },
+    "gfg": {
+        "module": "utils.gfg_api",
+        "fetch": "fetch_gfg_stats",
+        "parse": "parse_raw",
+        "capabilities": set(),
+    },
+    "hackerrank": {
+        "module": "utils.hackerrank_api",
+        "fetch": "fetch_hackerrank_stats",
+        "parse": "parse_raw",
+        "capabilities": set(),
+    },
+}
+
+_loaded = {}
+_load_lock = threading.Lock()
+
+
+def get_adapter(platform: str) -> dict:
+    """
+    Resolve a platform to {"fetch", "fetch_many", "parse", "capabilities"},
+    importing its module the first time it is needed.
+    """
+    platform = platform.lower()
+
+    with _load_lock:
+        if platform in _loaded:
+            return _loaded[platform]
+
+        spec = ADAPTERS.get(platform)
+        if spec is None:
+            raise ValueError(f"Unsupported platform: {platform}")
+
+        module = importlib.import_module(spec["module"])
+        adapter = {
+            "fetch": getattr(module, spec["fetch"]),
+            "fetch_many": (
+                getattr(module, spec["fetch_many"]) if spec.get("fetch_many") else None
+            ),
+            "parse": getattr(module, spec["parse"]),
+            "capabilities": frozenset(spec["capabilities"]),
+        }
+        _loaded[platform] = adapter
+        return adapter
+
+
+def supports(platform: str, capability: str) -> bool:
+    spec = ADAPTERS.get(platform.lower())
+    return bool(spec) and capability in spec["capabilities"]
+
+
+def fetch_all_platform_stats(platform: str, username: str, state=None):
     """
     Unified stats fetcher for all coding platforms
     Returns a dict with:
     easy_solved, medium_solved, hard_solved, total_solved
+
+    `state` is the previous sync state for incremental adapters
+    (currently Codeforces only). Raises CallRejectedError when the
+    call is rejected (breaker open, fetch deadline passed).
     """
+    adapter = get_adapter(platform)
 
-    platform = platform.lower()
+    if "incremental" in adapter["capabilities"]:
+        return adapter["fetch"](username, state=state)
+
+    return adapter["fetch"](username)
+
+
+def fetch_many_platform_stats(platform: str, handles, states=None) -> dict:
+    """
+    Fetch several handles of one platform.
+    Uses the adapter's fetch_many when it has one (one upstream call per
+    batch), otherwise falls back to one fetch per handle.
+    Returns {handle: stats or None}; handles whose calls were rejected
+    (breaker open, fetch deadline passed) are left out, so callers can tell "not attempted" from
+    "failed".
+    """
+    adapter = get_adapter(platform)
+    states = states or {}
+
+    if adapter["fetch_many"]:
+        return adapter["fetch_many"](list(handles), states=states)
+
+    results = {}
+    for handle in handles:
+        try:
+            results[handle] = fetch_all_platform_stats(
+                platform, handle, state=states.get(handle)
+            )
+        except CallRejectedError:
+            continue
+    return results
 
-    if platform == "leetcode":
-        return fetch_profile_counts(username)
-
-    # ---- future-ready stubs ----
-    elif platform == "codeforces":
-         return fetch_codeforces_stats(username)
-    
-    elif platform == "gfg":
-         return fetch_gfg_stats(username)
-    
-    elif platform == "hackerrank":
-         return fetch_hackerrank_stats(username)
-
-    else:
-        raise ValueError(f"Unsupported platform: {platform}")
+
+def parse_platform_payload(platform: str, raw, state=None, **context):
+    """
+    Re-derive stats from an archived raw payload (see pipeline/replay.py).
+    `context` carries adapter-specific archived inputs
+    (Codeforces: problem_index).
+    """
+    return get_adapter(platform)["parse"](raw, state=state, **context)
@@ -0,0 +1,77 @@
+# utils/circuit_breaker.py
+import threading
+import time
+
+
+class CallRejectedError(RuntimeError):
+    """
+    The call was never made (breaker open, fetch budget spent); callers
+    treat the profile as skipped rather than failed.
+    """
+
+
+class CircuitOpenError(CallRejectedError):
+    """Raised instead of calling an upstream whose breaker is open."""
+
+
+class CircuitBreaker:
+    """
+    closed    → every call allowed; `threshold` consecutive failures open it
+    open      → calls rejected until `cooldown` seconds have passed
+    half_open → a single trial call; success closes, failure re-opens
+    """
+
+    def __init__(self, threshold: int = 5, cooldown: float = 120.0):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.state = "closed"
+        self.failures = 0
+        self._opened_at = 0.0
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == "closed":
+                return True
+
+            if self.state == "open":
+                if time.monotonic() - self._opened_at < self.cooldown:
+                    return False
+                self.state = "half_open"
+
+            # half_open: let exactly one trial through
+            if self._trial_running:
+                return False
+            self._trial_running = True
+            return True
+
+    def is_open(self) -> bool:
+        with self._lock:
+            return (
+                self.state == "open"
+                and time.monotonic() - self._opened_at < self.cooldown
+            )
+
+    def record_success(self):
+        with self._lock:
+            self.state = "closed"
+            self.failures = 0
+            self._trial_running = False
+
+    def release(self):
+        """
+        End a call without a verdict (e.g. it raised something that
+        isn't an upstream failure), so a half-open breaker can let the
+        next trial through instead of staying blocked.
+        """
+        with self._lock:
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial_running = False
+            if self.state == "half_open" or self.failures >= self.threshold:
+                self.state = "open"
+                self._opened_at = time.monotonic()
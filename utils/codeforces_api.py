@@ -1,34 +1,341 @@
 # utils/codeforces_api.py
-import requests
+import os
+import time
+import zlib
+import threading
 
+from utils.http_client import http_get
+from utils.circuit_breaker import CallRejectedError
 
-def fetch_codeforces_stats(handle: str) -> dict | None:
+# Overridable so the fetch stage can run against a local stub server
+BASE_URL = os.getenv("CODEFORCES_API_URL", "https://codeforces.com/api")
+
+# user.status page sizes: big pages for a first full pull,
+# small ones when only catching up since the last run
+FULL_PAGE_SIZE = 1000
+INCREMENTAL_PAGE_SIZE = 100
+
+# Handles per user.info call in fetch_codeforces_many
+USER_INFO_BATCH = 100
+
+# lastOnlineTimeSeconds is Codeforces' clock, checked_at ours: a handle
+# only counts as idle if it was last online this long before the check
+LAST_ONLINE_MARGIN = int(os.getenv("CODEFORCES_LAST_ONLINE_MARGIN", "300"))
+
+# problemset.problems is downloaded at most once a day
+PROBLEMSET_TTL = 24 * 3600
+
+# Rating buckets: < 1200 easy, < 1900 medium, otherwise hard.
+# Unrated / unknown problems count as medium so the three buckets
+# always add up to total_solved.
+EASY_MAX_RATING = 1200
+MEDIUM_MAX_RATING = 1900
+
+_problem_index = None
+_problem_index_at = 0.0
+_problem_index_lock = threading.Lock()
+
+
+def encode_solved(solved: set) -> bytes:
+    """
+    Compact storage form of a solved set: zlib-compressed,
+    sorted 'contestId/index' list. Problems without a contest
+    (contestId None) are stored as '/index'.
+    """
+    keys = sorted(
+        f"{'' if contest is None else contest}/{index}"
+        for contest, index in solved
+    )
+    return zlib.compress(",".join(keys).encode())
+
+
+def _contest_key(contest: str):
+    if contest.isdigit():
+        return int(contest)
+    # "None" was written for contest-less problems by older versions
+    if contest in ("", "None"):
+        return None
+    return contest
+
+
+def decode_solved(blob) -> set:
+    if not blob:
+        return set()
+
+    payload = zlib.decompress(bytes(blob)).decode()
+    if not payload:
+        return set()
+
+    solved = set()
+    for key in payload.split(","):
+        contest, index = key.split("/", 1)
+        solved.add((_contest_key(contest), index))
+    return solved
+
+
+def rating_bucket(rating) -> str:
+    if rating is None:
+        return "medium"
+    if rating < EASY_MAX_RATING:
+        return "easy"
+    if rating < MEDIUM_MAX_RATING:
+        return "medium"
+    return "hard"
+
+
+def load_problem_index() -> dict:
+    """
+    (contestId, index) → "easy" / "medium" / "hard".
+
+    Built from a single problemset.problems download, kept on disk by
+    the HTTP cache and in memory for the rest of the process, so both
+    are refreshed at most once per PROBLEMSET_TTL.
+    Returns the previous index (or {}) if the download fails.
+    """
+    global _problem_index, _problem_index_at
+
+    with _problem_index_lock:
+        if (
+            _problem_index is not None
+            and time.time() - _problem_index_at < PROBLEMSET_TTL
+        ):
+            return _problem_index
+
+        try:
+            res = http_get(
+                "codeforces", "problemset",
+                f"{BASE_URL}/problemset.problems", ttl=PROBLEMSET_TTL
+            )
+            data = res.json()
+            if data["status"] != "OK":
+                return _problem_index or {}
+
+            _problem_index = {
+                (p["contestId"], p["index"]): rating_bucket(p.get("rating"))
+                for p in data["result"]["problems"]
+                if "contestId" in p
+            }
+            _problem_index_at = time.time()
+
+        except Exception:
+            return _problem_index or {}
+
+        return _problem_index
+
+
+def classify_solved(solved: set, index: dict | None = None) -> dict | None:
+    """
+    Count solved problems per difficulty bucket with plain dict lookups.
+    `index` defaults to load_problem_index().
+    Returns None when the problem index is unavailable.
+    """
+    index = load_problem_index() if index is None else index
+    if not index:
+        return None
+
+    counts = {"easy": 0, "medium": 0, "hard": 0}
+    for key in solved:
+        counts[index.get(key, "medium")] += 1
+    return counts
+
+
+def _build_stats(solved: set, sync_state: dict, index: dict | None = None) -> dict:
+    # Buckets from problem ratings (None if the index is unavailable)
+    buckets = classify_solved(solved, index) or {}
+
+    return {
+        "platform": "codeforces",
+        "easy_solved": buckets.get("easy"),
+        "medium_solved": buckets.get("medium"),
+        "hard_solved": buckets.get("hard"),
+        "total_solved": len(solved),
+        "sync_state": sync_state,
+    }
+
+
+def fetch_codeforces_stats(handle: str, state: dict | None = None) -> dict | None:
     """
     Fetch solved problem stats from Codeforces API.
+
+    `state` is the previous run's sync state
+    ({"last_submission_id", "solved", "checked_at", "pending"}). user.status
+    is paged newest-first with from/count and paging stops at the last
+    seen submission id, so a daily run only downloads new submissions.
+
+    Submissions still being judged keep the watermark just below the
+    oldest of them, so they are read again once they have a verdict;
+    "pending" records that the state is waiting on such a verdict.
+    The updated state is returned under "sync_state".
     """
 
-    url = f"https://codeforces.com/api/user.status?handle={handle}"
+    last_id = state["last_submission_id"] if state else 0
+    solved = set(state["solved"]) if state else set()
+    newest_id = last_id
+    pending_ids = []
+    new_subs = []
+    page_size = INCREMENTAL_PAGE_SIZE if state else FULL_PAGE_SIZE
+    start = 1
+    checked_at = time.time()
 
     try:
-        res = requests.get(url, timeout=10)
-        data = res.json()
+        while True:
+            # Never served from the disk cache: a stale first page would
+            # hide new submissions while the watermark moves on.
+            res = http_get(
+                "codeforces", handle,
+                f"{BASE_URL}/user.status",
+                params={"handle": handle, "from": start, "count": page_size},
+                ttl=0
+            )
+            data = res.json()
 
-        if data["status"] != "OK":
-            return None
+            if data["status"] != "OK":
+                return None
+
+            page = data["result"]
+            reached_watermark = False
+
+            for sub in page:
+                if sub["id"] <= last_id:
+                    reached_watermark = True
+                    break
+
+                new_subs.append(sub)
+                newest_id = max(newest_id, sub["id"])
+                verdict = sub.get("verdict")
+                if verdict == "OK":
+                    problem = sub["problem"]
+                    solved.add((problem.get("contestId"), problem["index"]))
+                elif verdict in (None, "TESTING"):
+                    pending_ids.append(sub["id"])
+
+            if reached_watermark or len(page) < page_size:
+                break
+
+            start += page_size
+
+        # Still-judging submissions must be read again next run
+        if pending_ids:
+            newest_id = min(newest_id, min(pending_ids) - 1)
+
+        stats = _build_stats(solved, {
+            "last_submission_id": newest_id,
+            "solved": solved,
+            "checked_at": checked_at,
+            "pending": bool(pending_ids),
+        })
+        # the watermark these submissions were read after (for replay)
+        stats["raw"] = {"from_submission_id": last_id, "submissions": new_subs}
+        return stats
+
+    except CallRejectedError:
+        raise  # not attempted: skipped by the caller, not a failure
+    except Exception:
+        return None
+
+
+def parse_raw(raw: dict, state: dict | None = None, problem_index: dict | None = None) -> dict:
+    """
+    Replay an archived payload (the submissions that were new at fetch
+    time) on top of `state`, the result of replaying earlier payloads.
+
+    `problem_index` is the archived index for the payload's day; replay
+    never downloads problemset.problems, so results don't depend on
+    when it runs. Raises ValueError if it is missing, or if the payload
+    was read after a watermark the replayed state hasn't reached (its
+    history starts before the archive does).
+    """
+    if problem_index is None:
+        raise ValueError("no archived Codeforces problem index")
 
-        solved = set()
-        for sub in data["result"]:
-            if sub.get("verdict") == "OK":
-                solved.add((sub["problem"]["contestId"], sub["problem"]["index"]))
+    solved = set(state["solved"]) if state else set()
+    newest_id = state["last_submission_id"] if state else 0
+
+    from_id = raw.get("from_submission_id")
+    if from_id is None or from_id > newest_id:
+        raise ValueError(
+            f"payload starts after submission {from_id}, "
+            f"replayed history only reaches {newest_id}"
+        )
+
+    for sub in raw.get("submissions", []):
+        newest_id = max(newest_id, sub["id"])
+        if sub.get("verdict") == "OK":
+            problem = sub["problem"]
+            solved.add((problem.get("contestId"), problem["index"]))
+
+    return _build_stats(solved, {
+        "last_submission_id": newest_id,
+        "solved": solved,
+        "checked_at": None,
+        "pending": False,
+    }, problem_index)
+
+
+def _last_online(handles) -> dict:
+    """
+    {handle.lower(): lastOnlineTimeSeconds} from one user.info call,
+    or {} if the call fails (e.g. one unknown handle fails the batch).
+    """
+    try:
+        res = http_get(
+            "codeforces", "user.info",
+            f"{BASE_URL}/user.info",
+            params={"handles": ";".join(handles)},
+            ttl=0
+        )
+        data = res.json()
+        if data["status"] != "OK":
+            return {}
 
         return {
-            "platform": "codeforces",
-            "easy_solved": None,     # CF difficulty ≠ easy/medium/hard
-            "medium_solved": None,
-            "hard_solved": None,
-            "total_solved": len(solved),
+            u["handle"].lower(): u.get("lastOnlineTimeSeconds", 0)
+            for u in data["result"]
         }
 
     except Exception:
-        return None
+        return {}
+
+
+def fetch_codeforces_many(handles, states=None) -> dict:
+    """
+    Batch fetch for several handles.
+
+    One user.info call per USER_INFO_BATCH handles returns each handle's
+    lastOnlineTimeSeconds. A handle that hasn't been online since its
+    last check can't have new submissions, so its stored state is reused
+    without calling user.status at all, unless that state is still
+    waiting on a verdict (judging finishes whether or not the user
+    comes back online).
+    Returns {handle: stats or None}; handles whose calls were rejected
+    (breaker open, fetch deadline passed) are left out.
+    """
+    states = states or {}
+    results = {}
+
+    for i in range(0, len(handles), USER_INFO_BATCH):
+        batch = handles[i:i + USER_INFO_BATCH]
+        checked_at = time.time()
+        last_online = _last_online(batch)
+
+        for handle in batch:
+            state = states.get(handle)
+            seen = last_online.get(handle.lower())
+
+            if state and state.get("checked_at") and not state.get("pending") \
+                    and seen is not None \
+                    and seen < state["checked_at"] - LAST_ONLINE_MARGIN:
+                results[handle] = _build_stats(
+                    state["solved"], {**state, "checked_at": checked_at}
+                )
+                results[handle]["raw"] = {
+                    "from_submission_id": state["last_submission_id"],
+                    "submissions": [],
+                }
+            else:
+                try:
+                    results[handle] = fetch_codeforces_stats(handle, state=state)
+                except CallRejectedError:
+                    continue
 
+    return results
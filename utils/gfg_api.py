@@ -1,6 +1,92 @@
 # utils/gfg_api.py
-import requests
-from bs4 import BeautifulSoup
+from html.parser import HTMLParser
+
+from utils.http_client import http_get
+from utils.circuit_breaker import CallRejectedError
+
+SCORE_CARD_CLASS = "score_card_value"
+FEED_CHUNK = 8192
+
+
+class _Found(Exception):
+    pass
+
+
+class _ScoreCardParser(HTMLParser):
+    """
+    Streaming parser that collects the text of the first
+    <div class="score_card_value"> and stops right after it closes.
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.depth = 0
+        self.parts = []
+        self.text = None
+
+    def handle_starttag(self, tag, attrs):
+        if tag != "div":
+            return
+        if self.depth:
+            self.depth += 1
+            return
+
+        classes = (dict(attrs).get("class") or "").split()
+        if SCORE_CARD_CLASS in classes:
+            self.depth = 1
+
+    def handle_data(self, data):
+        if self.depth:
+            self.parts.append(data)
+
+    def handle_endtag(self, tag):
+        if tag == "div" and self.depth:
+            self.depth -= 1
+            if not self.depth:
+                self.text = "".join(self.parts)
+                raise _Found
+
+
+def extract_score_card(html: str) -> str | None:
+    """
+    Text of the first score card div, or None if the page has none.
+
+    Skips straight to the first mention of the class name and feeds the
+    parser in small chunks from there, so the rest of the page is never
+    tokenized and no tree is built.
+    """
+    pos = html.find(SCORE_CARD_CLASS)
+    if pos == -1:
+        return None
+
+    start = html.rfind("<", 0, pos)
+    parser = _ScoreCardParser()
+
+    try:
+        for i in range(max(start, 0), len(html), FEED_CHUNK):
+            parser.feed(html[i:i + FEED_CHUNK])
+        parser.close()
+    except _Found:
+        pass
+
+    return parser.text
+
+
+def parse_raw(html: str, state=None) -> dict:
+    """
+    Stats from a profile page (live or archived).
+    Raises ValueError if the score card isn't a number.
+    """
+    solved_text = extract_score_card(html)
+    total = int(solved_text.strip()) if solved_text is not None else 0
+
+    return {
+        "platform": "gfg",
+        "easy_solved": None,     # GFG doesn't split reliably
+        "medium_solved": None,
+        "hard_solved": None,
+        "total_solved": total,
+    }
 
 
 def fetch_gfg_stats(username: str) -> dict | None:
@@ -12,23 +98,15 @@ def fetch_gfg_stats(username: str) -> dict | None:
     headers = {"User-Agent": "Mozilla/5.0"}
 
     try:
-        res = requests.get(url, headers=headers, timeout=10)
+        res = http_get("gfg", username, url, headers=headers)
         if res.status_code != 200:
             return None
 
-        soup = BeautifulSoup(res.text, "html.parser")
-
-        solved_tag = soup.find("div", class_="score_card_value")
-        total = int(solved_tag.text.strip()) if solved_tag else 0
-
-        return {
-            "platform": "gfg",
-            "easy_solved": None,     # GFG doesn't split reliably
-            "medium_solved": None,
-            "hard_solved": None,
-            "total_solved": total,
-        }
+        stats = parse_raw(res.text)
+        stats["raw"] = res.text
+        return stats
 
+    except CallRejectedError:
+        raise  # not attempted: skipped by the caller, not a failure
     except Exception:
         return None
-
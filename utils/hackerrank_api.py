@@ -1,4 +1,11 @@
 # utils/hackerrank_api.py
+def parse_raw(raw, state=None) -> dict | None:
+    """
+    Nothing is fetched, so there is no payload to re-derive from.
+    """
+    return fetch_hackerrank_stats(None)
+
+
 def fetch_hackerrank_stats(username: str) -> dict | None:
     """
     HackerRank does not provide a public API.
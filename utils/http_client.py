@@ -0,0 +1,295 @@
+# utils/http_client.py
+import os
+import re
+import json
+import time
+import random
+import hashlib
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from utils.rate_limiter import RateLimiter
+from utils.circuit_breaker import CircuitBreaker, CircuitOpenError, CallRejectedError
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# On-disk response cache (one JSON file per platform/handle/url)
+CACHE_DIR = os.getenv("HTTP_CACHE_DIR", os.path.join(ROOT, "data", "http_cache"))
+CACHE_TTL = int(os.getenv("HTTP_CACHE_TTL", str(12 * 3600)))
+
+# Retry / backoff
+MAX_RETRIES = int(os.getenv("HTTP_MAX_RETRIES", "3"))
+BACKOFF_BASE = float(os.getenv("HTTP_BACKOFF_BASE", "0.5"))
+BACKOFF_MAX = 8.0
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# Per-platform circuit breaker
+BREAKER_THRESHOLD = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "5"))
+BREAKER_COOLDOWN = float(os.getenv("CIRCUIT_COOLDOWN_SECONDS", "120"))
+
+# Keep-alive pool size per host (should cover FETCH_CONCURRENCY)
+POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "16"))
+TIMEOUT = 10
+
+_session = None
+_session_lock = threading.Lock()
+_local = threading.local()
+_limiters = {}
+_breakers = {}
+_metrics = {}
+
+
+class DeadlineExceededError(CallRejectedError):
+    """Raised instead of starting a request after the fetch deadline."""
+
+
+class CachedResponse:
+    """
+    Minimal response object returned for both network and cache hits,
+    so adapters don't care where the body came from.
+    """
+
+    def __init__(self, status_code, text, headers=None, from_cache=False):
+        self.status_code = status_code
+        self.text = text
+        self.headers = headers or {}
+        self.from_cache = from_cache
+
+    def json(self):
+        return json.loads(self.text)
+
+
+def get_session() -> requests.Session:
+    """
+    Process-wide session so every adapter reuses pooled keep-alive
+    connections instead of opening a fresh TLS connection per call.
+    """
+    global _session
+
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=8, pool_maxsize=POOL_SIZE)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _session = session
+
+    return _session
+
+
+def set_rate_limits(limits: dict):
+    """
+    Requests/sec per platform, applied to every network request
+    (retries included, cache hits are free). 0 disables the limit.
+    """
+    with _session_lock:
+        for platform, rate in limits.items():
+            _limiters[platform] = RateLimiter(rate)
+
+
+def set_deadline(deadline):
+    """
+    time.monotonic() deadline for this thread's requests (None = none).
+    Request timeouts and retry backoff are capped by the time left, and
+    no request starts once it has passed.
+    """
+    _local.deadline = deadline
+
+
+def _time_left(timeout):
+    deadline = getattr(_local, "deadline", None)
+    if deadline is None:
+        return timeout
+
+    remaining = deadline - time.monotonic()
+    if remaining <= 0:
+        raise DeadlineExceededError("fetch budget exhausted")
+    return min(timeout, remaining)
+
+
+def get_breaker(platform) -> CircuitBreaker:
+    with _session_lock:
+        if platform not in _breakers:
+            _breakers[platform] = CircuitBreaker(BREAKER_THRESHOLD, BREAKER_COOLDOWN)
+        return _breakers[platform]
+
+
+def _record(platform, latency=None, error=False, cache_hit=False):
+    with _session_lock:
+        m = _metrics.setdefault(platform, {
+            "requests": 0, "errors": 0, "cache_hits": 0,
+            "latency_total": 0.0, "latency_max": 0.0,
+        })
+        if cache_hit:
+            m["cache_hits"] += 1
+            return
+        m["requests"] += 1
+        m["errors"] += int(error)
+        m["latency_total"] += latency
+        m["latency_max"] = max(m["latency_max"], latency)
+
+
+def get_metrics() -> dict:
+    """
+    Per-platform counters since the last reset_metrics():
+    requests, errors, cache_hits, avg/max latency (seconds), breaker state.
+    """
+    with _session_lock:
+        report = {}
+        for platform, m in _metrics.items():
+            breaker = _breakers.get(platform)
+            report[platform] = {
+                **m,
+                "latency_avg": m["latency_total"] / m["requests"] if m["requests"] else 0.0,
+                "breaker": breaker.state if breaker else "closed",
+            }
+        return report
+
+
+def reset_metrics():
+    with _session_lock:
+        _metrics.clear()
+
+
+# -------------------------------------------------
+# Disk cache
+# -------------------------------------------------
+def _cache_path(platform, key, url, params):
+    digest = hashlib.sha1(
+        json.dumps([url, sorted((params or {}).items())]).encode()
+    ).hexdigest()[:12]
+    safe_key = re.sub(r"[^A-Za-z0-9_.-]", "_", str(key))[:80]
+    return os.path.join(CACHE_DIR, platform, f"{safe_key}-{digest}.json")
+
+
+def _read_cache(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_cache(path, entry):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(entry, f)
+        os.replace(tmp, path)
+    except OSError:
+        pass
+
+
+# -------------------------------------------------
+# Network with retries
+# -------------------------------------------------
+def _backoff(attempt, retry_after=None):
+    if retry_after and retry_after.isdigit():
+        return min(BACKOFF_MAX, float(retry_after))
+
+    # full jitter: uniform(0, capped exponential)
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt))
+
+
+def _get_with_retries(platform, breaker, url, params, headers, timeout):
+    """
+    Every failed attempt counts toward the platform's breaker, and
+    retrying stops as soon as the breaker opens or the deadline passes,
+    so a dead upstream trips the breaker after `threshold` attempts.
+    """
+    session = get_session()
+    limiter = _limiters.get(platform)
+
+    for attempt in range(MAX_RETRIES + 1):
+        last_try = attempt == MAX_RETRIES
+        _time_left(timeout)
+        if limiter:
+            limiter.acquire()
+        try:
+            res = session.get(
+                url, params=params, headers=headers, timeout=_time_left(timeout)
+            )
+        except (requests.ConnectionError, requests.Timeout):
+            breaker.record_failure()
+            if last_try or breaker.is_open():
+                raise
+            time.sleep(_time_left(_backoff(attempt)))
+            continue
+
+        if res.status_code not in RETRY_STATUSES:
+            breaker.record_success()
+            return res
+
+        breaker.record_failure()
+        if last_try or breaker.is_open():
+            return res
+        time.sleep(_time_left(_backoff(attempt, res.headers.get("Retry-After"))))
+
+
+def http_get(platform, key, url, params=None, headers=None, ttl=None,
+             timeout=TIMEOUT) -> CachedResponse:
+    """
+    GET through the shared session.
+
+    - fresh cache entry (younger than ttl) → served from disk
+    - stale entry → conditional request (ETag / If-Modified-Since),
+      a 304 refreshes the entry without re-downloading the body
+    - ttl=0 bypasses the cache completely
+
+    Raises requests exceptions once retries are exhausted,
+    CircuitOpenError while the platform's breaker is open, and
+    DeadlineExceededError once this thread's deadline has passed.
+    """
+    ttl = CACHE_TTL if ttl is None else ttl
+    path = _cache_path(platform, key, url, params) if ttl > 0 else None
+    entry = _read_cache(path) if path else None
+
+    if entry and time.time() - entry["fetched_at"] < ttl:
+        _record(platform, cache_hit=True)
+        return CachedResponse(200, entry["body"], entry["headers"], from_cache=True)
+
+    breaker = get_breaker(platform)
+    if not breaker.allow():
+        raise CircuitOpenError(f"{platform} circuit is open")
+
+    req_headers = dict(headers or {})
+    if entry:
+        if entry["headers"].get("ETag"):
+            req_headers["If-None-Match"] = entry["headers"]["ETag"]
+        if entry["headers"].get("Last-Modified"):
+            req_headers["If-Modified-Since"] = entry["headers"]["Last-Modified"]
+
+    started = time.monotonic()
+    try:
+        res = _get_with_retries(platform, breaker, url, params, req_headers, timeout)
+    except requests.RequestException:
+        _record(platform, time.monotonic() - started, error=True)
+        raise
+    finally:
+        # a half-open trial must never stay claimed (deadline, bad URL, ...)
+        breaker.release()
+
+    upstream_error = res.status_code in RETRY_STATUSES
+    _record(platform, time.monotonic() - started, error=upstream_error)
+
+    if res.status_code == 304 and entry:
+        entry["fetched_at"] = time.time()
+        _write_cache(path, entry)
+        return CachedResponse(200, entry["body"], entry["headers"], from_cache=True)
+
+    validators = {
+        h: res.headers[h] for h in ("ETag", "Last-Modified") if h in res.headers
+    }
+
+    if res.status_code == 200 and path:
+        _write_cache(path, {
+            "url": url,
+            "fetched_at": time.time(),
+            "headers": validators,
+            "body": res.text,
+        })
+
+    return CachedResponse(res.status_code, res.text, validators)
@@ -1,23 +1,39 @@
-import requests
+import os
+
+from utils.http_client import http_get
+from utils.circuit_breaker import CallRejectedError
+
+# Overridable so the fetch stage can run against a local stub server
+BASE_URL = os.getenv("LEETCODE_API_URL", "https://leetcode-stats-api.herokuapp.com")
+
+def parse_raw(data: dict, state=None):
+    """
+    Stats from a leetcode-stats-api JSON payload (live or archived).
+    """
+    if "status" in data and data["status"] == "error":
+        return None
+
+    return {
+        "easy_solved": data.get("easySolved", 0),
+        "medium_solved": data.get("mediumSolved", 0),
+        "hard_solved": data.get("hardSolved", 0),
+        "total_solved": data.get("totalSolved", 0),
+    }
 
-BASE_URL = "https://leetcode-stats-api.herokuapp.com"
 
 def fetch_profile_counts(username: str):
     try:
-        resp = requests.get(f"{BASE_URL}/{username}", timeout=10)
+        resp = http_get("leetcode", username, f"{BASE_URL}/{username}")
         if resp.status_code != 200:
             return None
 
         data = resp.json()
-        if "status" in data and data["status"] == "error":
-            return None
-
-        return {
-            "easy_solved": data.get("easySolved", 0),
-            "medium_solved": data.get("mediumSolved", 0),
-            "hard_solved": data.get("hardSolved", 0),
-            "total_solved": data.get("totalSolved", 0),
-        }
+        stats = parse_raw(data)
+        if stats:
+            stats["raw"] = data
+        return stats
+    except CallRejectedError:
+        raise  # not attempted: skipped by the caller, not a failure
     except Exception:
         return None
 